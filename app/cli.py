@@ -0,0 +1,118 @@
+# cli.py -- python -m app.cli <command> ...
+import argparse
+import asyncio
+import json
+from app.controllers.imports import import_ndjson, shutdown_import_pool
+
+
+async def _file_chunks(path: str, size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+async def _import(args):
+    try:
+        report = await import_ndjson(args.kind, _file_chunks(args.path))
+    finally:
+        shutdown_import_pool()
+    print(json.dumps(report, indent=2, default=str))
+    return 1 if report["failed"] else 0
+
+
+async def _rebuild_cards(args):
+    from app.controllers import cards, itineraries, travelogues
+
+    counts = {
+        "itinerary": await cards.rebuild_cards("itinerary", itineraries.collection),
+        "travelogue": await cards.rebuild_cards("travelogue", travelogues.collection),
+    }
+    print(json.dumps(counts))
+    return 0
+
+
+async def _rebuild_search(args):
+    from app.controllers.search import rebuild_search_index
+
+    print(json.dumps({"indexed": await rebuild_search_index()}))
+    return 0
+
+
+async def _rebuild_related(args):
+    from app.controllers.related import rebuild_related
+
+    print(json.dumps({"documents": await rebuild_related()}))
+    return 0
+
+
+async def _backfill_published(args):
+    from app.controllers.published import backfill_published
+
+    print(json.dumps(await backfill_published()))
+    return 0
+
+
+async def _derive_route_maps(args):
+    from app.controllers.itineraries import backfill_route_maps
+
+    print(json.dumps({"itineraries": await backfill_route_maps()}))
+    return 0
+
+
+async def _extract_assets(args):
+    from app.controllers.assets import backfill_assets
+
+    print(json.dumps(await backfill_assets()))
+    return 0
+
+
+async def _migrate_schema(args):
+    from app.controllers.migrations import SchemaMigrator, reset_migrations
+
+    if args.restart:
+        await reset_migrations()
+    migrator = SchemaMigrator(batch_size=args.batch_size, pause=args.pause)
+    results = await migrator.migrate_all()
+    print(json.dumps(results))
+    return 0 if all(r["status"] == "done" for r in results.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="bulk import an NDJSON file")
+    p.add_argument("kind", choices=["itineraries", "travelogues"])
+    p.add_argument("path")
+    p.set_defaults(run=_import)
+
+    p = commands.add_parser("rebuild-cards", help="rebuild the content_cards read model")
+    p.set_defaults(run=_rebuild_cards)
+
+    p = commands.add_parser("rebuild-search", help="rebuild the search index snapshot from Mongo")
+    p.set_defaults(run=_rebuild_search)
+
+    p = commands.add_parser("rebuild-related", help="recompute every related-content list")
+    p.set_defaults(run=_rebuild_related)
+
+    p = commands.add_parser("backfill-published", help="snapshot published content that has no snapshot yet")
+    p.set_defaults(run=_backfill_published)
+
+    p = commands.add_parser("derive-route-maps", help="backfill stop locations and route_map totals")
+    p.set_defaults(run=_derive_route_maps)
+
+    p = commands.add_parser("extract-assets", help="move embedded image metadata into the asset registry")
+    p.set_defaults(run=_extract_assets)
+
+    p = commands.add_parser("migrate-schema", help="upgrade every document to the current schema_version")
+    p.add_argument("--pause", type=float, default=0, help="seconds between batches (default: no throttling)")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.add_argument("--restart", action="store_true", help="ignore saved progress, rescan from the start")
+    p.set_defaults(run=_migrate_schema)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(args.run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,100 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
+from app.utils.instrumentation import MongoCommandListener
 
 load_dotenv()
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "travtesting")
-client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=5000)
+# Commands slower than this are logged with the calling controller (0 disables)
+MONGO_SLOW_MS = float(os.getenv("MONGO_SLOW_MS", "100"))
+
+# Connection pool, per worker process. No I/O happens at import: the lifespan
+# pings, bootstraps indexes, warms the pool and closes the client (utils/database.py)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "4"))
+# Connections opened (and collections touched) before the first request
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", str(MONGO_MIN_POOL_SIZE)))
+# "0" when indexes are managed out of band (saves a round of createIndexes per worker start)
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") != "0"
+# Public list/filter/export/geo/card/related/engagement GETs; writes and
+# single-document reads (which fill the doc cache) always use the primary
+MONGO_PUBLIC_READ_PREFERENCE = os.getenv("MONGO_PUBLIC_READ_PREFERENCE", "secondaryPreferred")
+MONGO_MAX_STALENESS_S = int(os.getenv("MONGO_MAX_STALENESS_S", "-1"))  # -1: no limit, else >= 90
+
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    serverSelectionTimeoutMS=5000,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+    maxConnecting=MONGO_MAX_CONNECTING,
+    event_listeners=[MongoCommandListener(MONGO_SLOW_MS)],
+)
 db = client[DB_NAME]
+
+# List endpoints (keyset pagination)
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "20"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "100"))
+
+# Sequence numbers reserved per counters round trip (itinerary_NNN / tl-NNN ids)
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "100"))
+
+# Bulk NDJSON import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Validation processes per app worker, started on the first import. Every uvicorn
+# worker has its own pool, so the default splits the CPUs across WEB_CONCURRENCY
+# (uvicorn's --workers); the host runs up to WEB_CONCURRENCY * IMPORT_WORKERS
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1))))
+
+# Streaming export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "200"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+# Read-through cache for single-document reads
+DOC_CACHE_SIZE = int(os.getenv("DOC_CACHE_SIZE", "1000"))
+DOC_CACHE_TTL = float(os.getenv("DOC_CACHE_TTL", "60"))
+
+# Engagement metrics ingestion (buffered $inc flushes)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "2"))
+METRICS_FLUSH_MAX_KEYS = int(os.getenv("METRICS_FLUSH_MAX_KEYS", "5000"))
+
+# In-process full-text search: snapshot file loaded on startup ("" disables it)
+SEARCH_SNAPSHOT_PATH = os.getenv("SEARCH_SNAPSHOT_PATH", "search_index.snapshot")
+SEARCH_SNAPSHOT_INTERVAL = float(os.getenv("SEARCH_SNAPSHOT_INTERVAL", "30"))
+
+# Related content: entries kept per document and target kind
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "12"))
+
+# Image asset registry: records kept in memory for ?expand=images
+ASSET_CACHE_SIZE = int(os.getenv("ASSET_CACHE_SIZE", "5000"))
+ASSET_CACHE_TTL = float(os.getenv("ASSET_CACHE_TTL", "300"))
+
+# Published snapshots (immutable until the next publish), cached per worker by slug
+PUBLISHED_CACHE_SIZE = int(os.getenv("PUBLISHED_CACHE_SIZE", "2000"))
+PUBLISHED_CACHE_TTL = float(os.getenv("PUBLISHED_CACHE_TTL", "300"))
+
+# Schema migrations: background migrator batch size and pause between batches
+# (throttling), lease on the per-kind progress row shared by all workers
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "200"))
+MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0.5"))
+MIGRATION_LEASE_SECONDS = float(os.getenv("MIGRATION_LEASE_SECONDS", "60"))
+MIGRATION_ON_STARTUP = os.getenv("MIGRATION_ON_STARTUP", "1") != "0"
+
+# Home feed: published content ranked by engagement (log-damped) plus recency
+# (halves every FEED_HALF_LIFE_DAYS); recomputed every FEED_REFRESH_INTERVAL
+FEED_REFRESH_INTERVAL = float(os.getenv("FEED_REFRESH_INTERVAL", "60"))
+FEED_HALF_LIFE_DAYS = float(os.getenv("FEED_HALF_LIFE_DAYS", "7"))
+FEED_RECENCY_WEIGHT = float(os.getenv("FEED_RECENCY_WEIGHT", "6"))
+FEED_ENGAGEMENT_WEIGHT = float(os.getenv("FEED_ENGAGEMENT_WEIGHT", "1"))
+FEED_PRECOMPUTED_PAGES = int(os.getenv("FEED_PRECOMPUTED_PAGES", "5"))
+
+# Cross-worker invalidation: writes are announced on a capped collection every
+# worker tails ("capped") or watches ("changestream", replica sets / sharded);
+# "auto" picks change streams when the server supports them, "off" for one worker
+INVALIDATION_BUS = os.getenv("INVALIDATION_BUS", "auto")
+INVALIDATION_BUS_SIZE = int(os.getenv("INVALIDATION_BUS_SIZE", str(16 * 2**20)))  # bytes
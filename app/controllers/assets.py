@@ -0,0 +1,158 @@
+# controllers/assets.py
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from app.config import db, ASSET_CACHE_SIZE, ASSET_CACHE_TTL
+from app.controllers import cards, invalidation
+from app.utils.assets import ASSET_FIELDS, collect_refs, expand_refs, extract_assets
+from app.utils.serialization import strip_none
+from app.utils.versioning import now_iso
+from app.utils.instrumentation import traced
+
+# Image asset registry: one record per distinct image (_id = hash of URL +
+# metadata); itineraries and travelogues keep references, see utils/assets.py
+collection = db["image_assets"]
+
+class AssetCache:
+    # LRU + TTL over registry records; every expansion goes through it
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, id: str) -> dict | None:
+        entry = self._entries.get(id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[id]
+            return None
+        self._entries.move_to_end(id)
+        return entry[1]
+
+    def put(self, id: str, asset: dict):
+        self._entries[id] = (time.monotonic() + self.ttl, asset)
+        self._entries.move_to_end(id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, id: str):
+        self._entries.pop(id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+cache = AssetCache(ASSET_CACHE_SIZE, ASSET_CACHE_TTL)
+
+@traced
+async def register_assets(found: dict):
+    # insert-only: metadata edited through update_asset is never overwritten
+    if not found:
+        return
+    created = now_iso()
+    ops = [
+        UpdateOne({"_id": h}, {"$setOnInsert": {**asset, "created_at": created}}, upsert=True)
+        for h, asset in found.items()
+    ]
+    await collection.bulk_write(ops, ordered=False)
+
+@traced
+async def store_images(values: list) -> list:
+    # -> values with embedded images replaced by references, registry updated
+    found = {}
+    out = [extract_assets(v, found) for v in values]
+    await register_assets(found)
+    return out
+
+@traced
+async def fetch_assets(ids) -> dict:
+    assets, missing = {}, []
+    for id in ids:
+        asset = cache.get(id)
+        if asset is None:
+            missing.append(id)
+        else:
+            assets[id] = asset
+    if missing:
+        async for asset in collection.find({"_id": {"$in": missing}}):
+            cache.put(asset["_id"], asset)
+            assets[asset["_id"]] = asset
+    return assets
+
+@traced
+async def expand_images(docs: list) -> list:
+    # one $in for every reference across the documents not already cached
+    refs = set()
+    for doc in docs:
+        collect_refs(doc, refs)
+    if not refs:
+        return docs
+    assets = await fetch_assets(refs)
+    return [expand_refs(doc, assets) for doc in docs]
+
+@traced
+async def get_asset(id: str):
+    assets = await fetch_assets([id])
+    return assets.get(id)
+
+@traced
+async def update_asset(id: str, data: dict):
+    set_doc = strip_none(data)
+    unknown = set(set_doc) - ASSET_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"not asset fields: {sorted(unknown)}")
+    if "image_url" in set_doc:
+        # references copy the URL so plain reads can render it; a new image is a
+        # new asset, stored by writing it on the document
+        raise HTTPException(status_code=400, detail="image_url cannot change; store the new image on the document")
+    if not set_doc:
+        raise HTTPException(status_code=400, detail="nothing to update")
+    set_doc["updated_at"] = now_iso()
+    asset = await collection.find_one_and_update(
+        {"_id": id}, {"$set": set_doc}, return_document=ReturnDocument.AFTER
+    )
+    if asset is None:
+        return None
+    cache.invalidate(id)
+    await _refresh_users(id)
+    await invalidation.bus.publish("asset", "asset", [id])
+    return asset
+
+async def _refresh_users(id: str):
+    # one record changed, every expansion sees it: only caches and cards that
+    # copied the cover image need refreshing
+    from app.controllers import itineraries, travelogues
+
+    for kind, module in (("itinerary", itineraries), ("travelogue", travelogues)):
+        module.doc_cache.clear()
+        docs = await module.collection.find({"cover_image.asset": id}, cards.CARD_SOURCE_FIELDS).to_list(length=None)
+        await cards.upsert_cards(kind, await expand_images(docs))
+
+@traced
+async def backfill_assets(batch_size: int = 500) -> dict:
+    # rewrite documents stored with embedded images to references; guarded on
+    # version so a concurrent edit is never overwritten (it stores references itself)
+    from app.controllers import itineraries, travelogues
+
+    counts = {}
+    for kind, module in (("itinerary", itineraries), ("travelogue", travelogues)):
+        ops, found, count = [], {}, 0
+        async for doc in module.collection.find({}):
+            new = extract_assets(doc, found)
+            changed = {k: v for k, v in new.items() if v != doc.get(k)}
+            if not changed:
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"], "version": doc.get("version")}, {"$set": changed}))
+            count += 1
+            if len(ops) >= batch_size:
+                await register_assets(found)  # registry first: references never dangle
+                await module.collection.bulk_write(ops, ordered=False)
+                ops, found = [], {}
+        if ops:
+            await register_assets(found)
+            await module.collection.bulk_write(ops, ordered=False)
+        module.doc_cache.clear()
+        await invalidation.bus.publish(kind, "clear", ["*"])
+        counts[kind] = count
+    return counts
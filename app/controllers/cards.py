@@ -0,0 +1,109 @@
+# controllers/cards.py
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+from app.config import db
+from app.utils.database import public_reads
+from app.utils.pagination import paginate
+from app.utils.instrumentation import traced
+
+# Compact, listing-only view of itineraries and travelogues. Cards share the _id
+# of their source document, so "created" order and keyset tokens work unchanged.
+collection = db["content_cards"]
+reads = public_reads(collection)
+
+LIST_SORTS = {"created": "_id", "title": "title"}
+
+@traced
+async def ensure_card_indexes():
+    await collection.create_indexes([
+        IndexModel([("kind", ASCENDING), ("id", ASCENDING)], name="kind_id"),
+        IndexModel([("kind", ASCENDING), ("_id", ASCENDING)], name="kind__id"),
+        IndexModel([("kind", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)], name="kind_title__id"),
+        IndexModel([("kind", ASCENDING), ("categories", ASCENDING)], name="kind_categories"),
+        IndexModel([("kind", ASCENDING), ("destinations", ASCENDING)], name="kind_destinations"),
+    ])
+
+def _pick(doc: dict, *fields: str) -> dict:
+    return {f: doc[f] for f in fields if doc.get(f) is not None}
+
+def build_card(kind: str, doc: dict) -> dict:
+    card = {"_id": doc["_id"], "kind": kind}
+    card.update(_pick(doc, "id", "slug", "title", "subtitle", "destinations", "categories"))
+    cover = doc.get("cover_image") or {}
+    card["cover_image"] = _pick(cover, "image_url", "alt_text", "blurhash", "aspect_ratio")
+    if kind == "itinerary":
+        card.update(_pick(doc, "status", "duration_days", "budget_tier", "best_season", "perfect_for"))
+    else:
+        filters = doc.get("filter_keys") or {}
+        card.update(_pick(doc, "published_at"))
+        card.update(_pick(filters, "duration_days", "season", "region", "travel_type"))
+        if doc.get("author"):
+            card["author"] = doc["author"].get("name")
+    return card
+
+@traced
+async def upsert_cards(kind: str, docs: list[dict]):
+    ops = [ReplaceOne({"_id": doc["_id"]}, build_card(kind, doc), upsert=True) for doc in docs if doc]
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+
+@traced
+async def delete_card(kind: str, id: str):
+    await collection.delete_many({"kind": kind, "id": id})
+
+# the source fields build_card reads
+CARD_SOURCE_FIELDS = [
+    "id", "slug", "title", "subtitle", "destinations", "categories", "cover_image", "status", "duration_days",
+    "budget_tier", "best_season", "perfect_for", "published_at", "filter_keys", "author",
+]
+
+@traced
+async def rebuild_cards(kind: str, source, batch_size: int = 500) -> int:
+    # backfill/repair: upsert a card for every source document, then drop orphans
+    # documents hold image references; cards copy the asset metadata, so every
+    # batch is expanded first
+    from app.controllers.assets import expand_images  # assets imports this module
+
+    seen, batch = set(), []
+
+    async def flush(batch):
+        docs = await expand_images(batch)
+        await collection.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, build_card(kind, doc), upsert=True) for doc in docs], ordered=False
+        )
+
+    async for doc in source.find({}, CARD_SOURCE_FIELDS):
+        seen.add(doc["_id"])
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    orphans = [c["_id"] async for c in collection.find({"kind": kind}, {"_id": 1}) if c["_id"] not in seen]
+    for i in range(0, len(orphans), batch_size):
+        await collection.delete_many({"_id": {"$in": orphans[i:i + batch_size]}})
+    return len(seen)
+
+@traced
+async def list_cards(
+    kind: str | None,
+    limit: int,
+    cursor: str | None = None,
+    sort: str | None = None,
+    categories: list[str] | None = None,
+    destinations: list[str] | None = None,
+):
+    query = {"kind": kind} if kind else {}
+    if categories:
+        query["categories"] = {"$in": categories}
+    if destinations:
+        query["destinations"] = {"$in": destinations}
+    return await paginate(
+        reads,
+        query,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+    )
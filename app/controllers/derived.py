@@ -0,0 +1,40 @@
+# controllers/derived.py
+# Read models kept in step with the source collections. Every controller that
+# writes itineraries or travelogues calls these after the write succeeds.
+# The write has already committed by then: a read model that fails to update is
+# logged and left to its rebuild command, it never turns the write into a 500.
+import inspect
+import logging
+from app.controllers import assets, cards, invalidation, published, related, search
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+async def _step(name: str, kind: str, step, *args):
+    try:
+        result = step(*args)
+        if inspect.isawaitable(result):
+            await result
+    except Exception:
+        logger.exception("%s not updated after %s write", name, kind)
+
+@traced
+async def after_write(kind: str, docs: list[dict]):
+    # docs: full stored documents (ObjectId _id), as returned by the write; cards
+    # copy image metadata, so they are built from the expanded documents
+    try:
+        docs = await assets.expand_images(docs)
+    except Exception:
+        logger.exception("images not expanded for derived %s views", kind)
+    await _step("cards", kind, cards.upsert_cards, kind, docs)
+    await _step("related lists", kind, related.refresh_related, kind, docs)  # queued
+    await _step("search index", kind, search.service.index_documents, kind, docs)
+    await _step("invalidation", kind, invalidation.bus.publish, kind, "write", [doc["id"] for doc in docs if doc and doc.get("id")])
+
+@traced
+async def after_delete(kind: str, id: str):
+    await _step("published snapshot", kind, published.remove_published, kind, id)  # a deleted document goes offline too
+    await _step("cards", kind, cards.delete_card, kind, id)
+    await _step("related lists", kind, related.remove_related, kind, id)
+    await _step("search index", kind, search.service.remove, kind, id)
+    await _step("invalidation", kind, invalidation.bus.publish, kind, "delete", [id])
@@ -0,0 +1,271 @@
+# controllers/feed.py
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from app.config import (
+    FEED_ENGAGEMENT_WEIGHT,
+    FEED_HALF_LIFE_DAYS,
+    FEED_PRECOMPUTED_PAGES,
+    FEED_RECENCY_WEIGHT,
+    FEED_REFRESH_INTERVAL,
+    PAGE_SIZE_DEFAULT,
+)
+from app.controllers import metrics
+from app.utils.cache import CachedDocument, make_etag
+from app.utils.serialization import dumps
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+# Home feed: every published itinerary and travelogue (the card stored with its
+# snapshot), ranked by recency plus engagement. The ranking lives in memory and is
+# recomputed every FEED_REFRESH_INTERVAL (engagement moves, recency decays);
+# publish/unpublish patch it in between. Items are serialized once per ranking and
+# pages are spliced from those bytes; the first pages are rendered ahead of time.
+
+# engagement counter -> weight (counters missing on a kind count as 0)
+ENGAGEMENT_WEIGHTS = {
+    "views": 1,
+    "likes": 5,
+    "saves": 6,
+    "shares": 8,
+    "feedback_inspiring": 4,
+    "dislikes": -3,
+    "feedback_not_useful": -3,
+}
+# rankings kept for in-flight pagination after a refresh or publish
+KEPT_GENERATIONS = 4
+PAGE_CACHE_SIZE = 512
+
+def _sources() -> dict:
+    from app.controllers import published
+
+    return published.collections
+
+def _timestamp(value: str | None) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+def engagement(counters: dict) -> float:
+    return sum(counters.get(field, 0) * weight for field, weight in ENGAGEMENT_WEIGHTS.items())
+
+def score(counters: dict, published_ts: float, now: float) -> float:
+    # log damping keeps one viral item from pinning the top; recency halves every
+    # FEED_HALF_LIFE_DAYS, so fresh content surfaces before it has any engagement
+    age_days = max(now - published_ts, 0) / 86400
+    recency = 0.5 ** (age_days / FEED_HALF_LIFE_DAYS)
+    return FEED_ENGAGEMENT_WEIGHT * math.log1p(max(engagement(counters), 0)) + FEED_RECENCY_WEIGHT * recency
+
+class FeedItem:
+    __slots__ = ("key", "kind", "id", "destinations", "categories", "published_ts", "counters", "score", "body")
+
+    def __init__(self, kind: str, card: dict, published_ts: float, counters: dict):
+        self.key = (kind, card["id"])
+        self.kind = kind
+        self.id = card["id"]
+        self.destinations = frozenset(card.get("destinations") or ())
+        self.categories = frozenset(card.get("categories") or ())
+        self.published_ts = published_ts
+        self.counters = counters
+        self.score = 0.0
+        item = {k: v for k, v in card.items() if k != "_id"}
+        item["published_at"] = datetime.fromtimestamp(published_ts, timezone.utc).isoformat()
+        self.body = dumps(item)
+
+    def rank(self, now: float):
+        self.score = score(self.counters, self.published_ts, now)
+
+def _sort_key(item: FeedItem):
+    return (-item.score, -item.published_ts, item.key)
+
+def _token(generation: int, offset: int) -> str:
+    raw = json.dumps({"g": generation, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _parse_token(token: str) -> tuple[int, int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode((token + "=" * (-len(token) % 4)).encode()))
+        generation, offset = int(data["g"]), int(data["o"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="invalid next token")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="invalid next token")
+    return generation, offset
+
+class FeedService:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.items: dict[tuple[str, str], FeedItem] = {}
+        self.generation = 0
+        # generation -> ranked items; older generations serve pages already in flight
+        self._rankings: OrderedDict[int, list[FeedItem]] = OrderedDict()
+        # (generation, filters, offset, limit) -> rendered page
+        self._pages: OrderedDict[tuple, CachedDocument] = OrderedDict()
+        self._filtered: OrderedDict[tuple, list[FeedItem]] = OrderedDict()
+        # publishes/removals made while a refresh is reading, re-applied on top of it
+        self._changes: dict[tuple[str, str], FeedItem | None] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _counters(self, kind: str, ids: list[str]) -> dict[str, dict]:
+        out = {}
+        fields = {"content_id": 1, **{field: 1 for field in ENGAGEMENT_WEIGHTS if field in metrics.COUNTERS[kind]}}
+        reads = metrics.reads[kind]
+        for i in range(0, len(ids), 1000):
+            async for row in reads.find({"content_id": {"$in": ids[i:i + 1000]}, "date_key": metrics.TOTAL}, fields):
+                out[row["content_id"]] = row
+        return out
+
+    def _rerank(self):
+        now = time.time()
+        for item in self.items.values():
+            item.rank(now)
+        self.generation += 1
+        self._rankings[self.generation] = sorted(self.items.values(), key=_sort_key)
+        while len(self._rankings) > KEPT_GENERATIONS:
+            self._rankings.popitem(last=False)
+        self._filtered.clear()
+        self._pages.clear()
+        self._precompute()
+
+    @traced
+    async def refresh(self):
+        self._changes = {}
+        try:
+            items = await self._load()
+            for key, item in self._changes.items():
+                if item is None:
+                    items.pop(key, None)
+                else:
+                    items[key] = item
+        finally:
+            self._changes = None
+        self.items = items
+        self._rerank()
+
+    async def _load(self) -> dict[tuple[str, str], FeedItem]:
+        items = {}
+        for kind, collection in _sources().items():
+            rows = await collection.find({}, {"card": 1, "first_published_at": 1, "published_at": 1}).to_list(length=None)
+            counters = await self._counters(kind, [row["card"]["id"] for row in rows])
+            for row in rows:
+                published_ts = _timestamp(row.get("first_published_at") or row.get("published_at"))
+                item = FeedItem(kind, row["card"], published_ts, counters.get(row["card"]["id"], {}))
+                items[item.key] = item
+        return items
+
+    def _precompute(self):
+        # the default feed's first pages, ready before anyone asks
+        for page in range(FEED_PRECOMPUTED_PAGES):
+            self.page(PAGE_SIZE_DEFAULT, offset=page * PAGE_SIZE_DEFAULT)
+
+    async def publish(self, kind: str, snapshot: dict):
+        counters = (await self._counters(kind, [snapshot["id"]])).get(snapshot["id"], {})
+        published_ts = _timestamp(snapshot.get("first_published_at") or snapshot.get("published_at"))
+        item = FeedItem(kind, snapshot["card"], published_ts, counters)
+        self.items[item.key] = item
+        if self._changes is not None:
+            self._changes[item.key] = item
+        self._rerank()
+
+    def remove(self, kind: str, id: str):
+        if self._changes is not None:
+            self._changes[(kind, id)] = None
+        if self.items.pop((kind, id), None) is not None:
+            self._rerank()
+
+    def _ranking(self, generation: int | None) -> tuple[int, list[FeedItem]]:
+        if generation in self._rankings:
+            return generation, self._rankings[generation]
+        # unknown or expired token: continue on the current ranking
+        return self.generation, self._rankings.get(self.generation, [])
+
+    def _filter(self, generation: int, ranking: list[FeedItem], filters: tuple) -> list[FeedItem]:
+        kind, destinations, categories = filters
+        if not (kind or destinations or categories):
+            return ranking
+        key = (generation, filters)
+        found = self._filtered.get(key)
+        if found is None:
+            found = [
+                item for item in ranking
+                if (not kind or item.kind == kind)
+                and (not destinations or item.destinations & destinations)
+                and (not categories or item.categories & categories)
+            ]
+            self._filtered[key] = found
+            while len(self._filtered) > PAGE_CACHE_SIZE:
+                self._filtered.popitem(last=False)
+        self._filtered.move_to_end(key)
+        return found
+
+    def page(
+        self,
+        limit: int,
+        token: str | None = None,
+        kind: str | None = None,
+        destinations: list[str] | None = None,
+        categories: list[str] | None = None,
+        offset: int = 0,
+    ) -> CachedDocument:
+        generation = None
+        if token:
+            generation, offset = _parse_token(token)
+        generation, ranking = self._ranking(generation)
+        filters = (kind, frozenset(destinations or ()), frozenset(categories or ()))
+        key = (generation, filters, offset, limit)
+        entry = self._pages.get(key)
+        if entry is not None:
+            self._pages.move_to_end(key)
+            return entry
+        items = self._filter(generation, ranking, filters)
+        chunk = items[offset:offset + limit]
+        next_token = _token(generation, offset + limit) if offset + limit < len(items) else None
+        body = b'{"items":[' + b",".join(item.body for item in chunk) + b'],"next":' + dumps(next_token) + b"}"
+        entry = CachedDocument(None, None, body, make_etag(body), 0.0)
+        self._pages[key] = entry
+        while len(self._pages) > PAGE_CACHE_SIZE:
+            self._pages.popitem(last=False)
+        return entry
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("feed refresh failed; serving the previous ranking")
+
+    async def start(self):
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+service = FeedService(FEED_REFRESH_INTERVAL)
+
+@traced
+async def get_feed(
+    limit: int,
+    cursor: str | None = None,
+    kind: str | None = None,
+    destinations: list[str] | None = None,
+    categories: list[str] | None = None,
+) -> CachedDocument:
+    return service.page(limit, cursor, kind, destinations, categories)
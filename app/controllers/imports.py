@@ -0,0 +1,150 @@
+# controllers/imports.py
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.config import IMPORT_BATCH_SIZE, IMPORT_WORKERS
+from app.controllers import itineraries, travelogues
+from app.controllers.assets import store_images
+from app.controllers.derived import after_write
+from app.utils.bulk_validation import validate_chunk
+from app.utils.slugs import allocate_slugs, is_slug_conflict, slugify, write_with_unique_slug
+from app.utils.instrumentation import traced
+
+# kind -> (collection, id allocator, read-model kind)
+TARGETS = {
+    "itineraries": (itineraries.collection, itineraries.itinerary_ids, "itinerary"),
+    "travelogues": (travelogues.collection, travelogues.travelogue_ids, "travelogue"),
+}
+
+_pool: ProcessPoolExecutor | None = None
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if IMPORT_WORKERS <= 1:
+        return None
+    if _pool is None:
+        # spawn, not fork: this process runs Motor's and pymongo's threads, and a
+        # forked child inherits their locks in whatever state they were in
+        _pool = ProcessPoolExecutor(max_workers=IMPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown_import_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+async def _iter_records(chunks):
+    # re-split an async stream of byte chunks (request body or file) into numbered lines
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+async def _batches(records, size: int):
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _validate(kind: str, batch: list) -> list:
+    # Pydantic validation of the big models is CPU bound: spread each batch over
+    # the process pool so the event loop stays free to read and write
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(validate_chunk, kind, batch)
+    loop = asyncio.get_running_loop()
+    step = -(-len(batch) // IMPORT_WORKERS)
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, validate_chunk, kind, batch[i:i + step])
+        for i in range(0, len(batch), step)
+    ])
+    return [row for part in parts for row in part]
+
+async def _insert_batch(kind: str, validated: list, report: dict):
+    collection, allocator, doc_kind = TARGETS[kind]
+    docs, lines = [], []
+    for line_no, payload, errors in validated:
+        if errors is not None:
+            report["errors"].append({"line": line_no, "errors": errors})
+        else:
+            docs.append(payload)
+            lines.append(line_no)
+    if not docs:
+        return
+
+    # embedded images -> asset references, one registry write per batch
+    docs = await store_images(docs)
+
+    # ids and slugs for the whole batch: one counters round trip, one slug query
+    missing = [doc for doc in docs if not doc.get("id")]
+    for doc, new_id in zip(missing, await allocator.reserve(len(missing))):
+        doc["id"] = new_id
+    bases = [slugify(doc.get("slug") or doc.get("title") or "") or doc["id"] for doc in docs]
+    for doc, slug in zip(docs, await allocate_slugs(collection, bases)):
+        doc["slug"] = slug
+
+    # unordered: one bad record does not stop the rest of the batch
+    failed = {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        failed = {err["index"]: err for err in exc.details.get("writeErrors", [])}
+
+    inserted = []
+    for index, (doc, line_no) in enumerate(zip(docs, lines)):
+        err = failed.get(index)
+        if err is None:
+            inserted.append(doc)
+        elif is_slug_conflict(err):
+            # lost a slug race with a concurrent writer: fall back to the single-record path
+            if await _insert_one(collection, doc, bases[index], line_no, report):
+                inserted.append(doc)
+        else:
+            report["errors"].append({"line": line_no, "errors": err.get("errmsg", "write failed")})
+    report["inserted"] += len(inserted)
+    await after_write(doc_kind, inserted)
+
+async def _insert_one(collection, doc: dict, base_slug: str, line_no: int, report: dict) -> bool:
+    doc.pop("_id", None)
+
+    async def _insert(slug: str):
+        doc["slug"] = slug
+        return await collection.insert_one(doc)
+
+    try:
+        await write_with_unique_slug(collection, base_slug, _insert)
+        return True
+    except (DuplicateKeyError, HTTPException) as exc:
+        report["errors"].append({"line": line_no, "errors": str(exc)})
+        return False
+
+@traced
+async def import_ndjson(kind: str, chunks) -> dict:
+    report = {"received": 0, "inserted": 0, "errors": []}
+    pending = None
+    async for batch in _batches(_iter_records(chunks), IMPORT_BATCH_SIZE):
+        report["received"] += len(batch)
+        validated = await _validate(kind, batch)
+        # validation of this batch overlapped the previous batch's insert
+        if pending is not None:
+            await pending
+        pending = asyncio.create_task(_insert_batch(kind, validated, report))
+    if pending is not None:
+        await pending
+    report["failed"] = len(report["errors"])
+    report["errors"].sort(key=lambda e: e["line"])
+    return report
@@ -0,0 +1,257 @@
+# controllers/invalidation.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId, Timestamp
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+from app.config import client, db, INVALIDATION_BUS, INVALIDATION_BUS_SIZE
+from app.utils.instrumentation import Counter, Histogram, registry, traced
+
+logger = logging.getLogger(__name__)
+
+# Every worker keeps its own caches and in-memory indexes (doc caches, published
+# snapshots, assets, search, related, feed). Writers announce what changed on one
+# capped collection; every worker tails it (or watches it with a change stream on
+# a replica set) and applies the same eviction/refresh the writing worker did.
+#   {_id, origin, kind, op, ids, at}
+# ops: write | delete | publish | unpublish | clear (doc cache) | asset (kind "asset")
+# Handlers are idempotent: replaying an event is harmless, missing one is not.
+collection = db["invalidations"]
+
+IDS_PER_EVENT = 500
+# events re-read when a cursor is reopened; covers clock skew between writers
+REPLAY_MARGIN = timedelta(seconds=5)
+RETRY_DELAY = 1.0
+
+events_total = registry.register(Counter(
+    "cache_invalidation_events_total", "Invalidation events applied from other workers", ("kind", "op"),
+))
+event_lag = registry.register(Histogram(
+    "cache_invalidation_lag_seconds", "Delay from an invalidation event being published to being applied here",
+))
+
+def _targets():
+    # imported here: every one of these publishes through this module
+    from app.controllers import assets, feed, itineraries, published, related, search, travelogues
+
+    return {"itinerary": itineraries, "travelogue": travelogues}, assets, feed, published, related, search
+
+class PositionLost(Exception):
+    # the worker fell further behind than the bus retains: events were missed
+    pass
+
+class InvalidationBus:
+    def __init__(self, mode: str, size: int):
+        self.mode = mode  # auto | capped | changestream | off
+        self.size = size
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._ensured = False
+        self._since: datetime | None = None
+        # read position, advanced as events are applied: a reconnect resumes here
+        # instead of replaying everything since _since
+        self._last_id: ObjectId | None = None
+        self._resume_token: dict | None = None
+        # ids applied within REPLAY_MARGIN of _last_id, skipped when a reopened
+        # tailable cursor reads them again
+        self._recent: dict[ObjectId, None] = {}
+        self._task: asyncio.Task | None = None
+
+    async def _ensure(self):
+        # an insert into a missing collection would create an uncapped one
+        if self._ensured:
+            return
+        try:
+            await db.create_collection(collection.name, capped=True, size=self.size)
+        except CollectionInvalid:
+            if not (await collection.options()).get("capped"):
+                logger.error("%s exists but is not capped; tailing it will fail", collection.name)
+        self._ensured = True
+
+    async def publish(self, kind: str, op: str, ids: list[str]):
+        # after the write succeeded; a failed publish leaves other workers on their TTLs
+        if self.mode == "off" or not ids:
+            return
+        now = datetime.now(timezone.utc)
+        events = [
+            {"origin": self.origin, "kind": kind, "op": op, "ids": ids[i:i + IDS_PER_EVENT], "at": now}
+            for i in range(0, len(ids), IDS_PER_EVENT)
+        ]
+        try:
+            await self._ensure()
+            await collection.insert_many(events, ordered=False)
+        except PyMongoError:
+            logger.warning("invalidation of %s %s %s not published", kind, op, ids[:5], exc_info=True)
+
+    @traced
+    async def apply(self, event: dict):
+        if event.get("origin") == self.origin:
+            return
+        kind, op, ids = event.get("kind"), event.get("op"), event.get("ids") or []
+        sources, assets, feed, published, related, search = _targets()
+        if op == "asset":
+            for id in ids:
+                assets.cache.invalidate(id)
+            for module in sources.values():
+                module.doc_cache.clear()  # expanded documents embed the asset
+        elif op in ("write", "delete", "clear"):
+            module = sources[kind]
+            if op == "clear":
+                module.doc_cache.clear()  # ids: ["*"]
+            else:
+                for id in ids:
+                    module.doc_cache.invalidate(id)
+            if op == "write":
+                # the stored read models were rewritten by the writer; only the
+                # in-memory indexes are brought up to date here
+                docs = await module.collection.find({"id": {"$in": ids}}).to_list(length=None)
+                docs = await assets.expand_images(docs)
+                await related.updater.submit("update", kind, docs, write=False)
+                search.service.index_documents(kind, docs)
+            elif op == "delete":
+                for id in ids:
+                    await related.updater.submit("remove", kind, id, write=False)
+                    search.service.remove(kind, id)
+        elif op in ("publish", "unpublish"):
+            for id in ids:
+                published.caches[kind].invalidate(id)
+            if op == "publish":
+                snapshots = published.collections[kind].find(
+                    {"id": {"$in": ids}}, {"id": 1, "card": 1, "published_at": 1, "first_published_at": 1}
+                )
+                async for snapshot in snapshots:
+                    await feed.service.publish(kind, snapshot)
+            else:
+                for id in ids:
+                    feed.service.remove(kind, id)
+        else:
+            return  # "hello", or an op from a newer deploy
+        events_total.inc(kind, op)
+        at = event.get("at")
+        if at is not None:
+            # naive UTC as read back from Mongo; across hosts this includes clock skew
+            event_lag.observe(max((datetime.now(timezone.utc) - at.replace(tzinfo=timezone.utc)).total_seconds(), 0))
+
+    async def _apply_logged(self, event: dict):
+        try:
+            await self.apply(event)
+        except Exception:
+            logger.exception("invalidation event %s failed to apply", event.get("_id"))
+
+    @traced
+    async def resync(self):
+        # missed events: drop every cache and reload the in-memory indexes
+        sources, assets, feed, published, related, search = _targets()
+        for module in sources.values():
+            module.doc_cache.clear()
+        for cache in published.caches.values():
+            cache.clear()
+        assets.cache.clear()
+        await related.load_related()
+        await search.service.rebuild(search._sources())
+        await feed.service.refresh()
+
+    def _applied(self, id: ObjectId):
+        if self._last_id is None or id > self._last_id:
+            self._last_id = id
+        self._recent[id] = None
+        cutoff = id.generation_time - REPLAY_MARGIN
+        for old in list(self._recent):
+            if old.generation_time >= cutoff:
+                break
+            del self._recent[old]
+
+    async def _tail(self):
+        # reopened a little behind: ObjectIds from other writers are not strictly ordered
+        if self._last_id is None:
+            last = ObjectId.from_datetime(self._since)
+        else:
+            last = ObjectId.from_datetime(self._last_id.generation_time - REPLAY_MARGIN)
+        while True:
+            # a tailable cursor whose query matches nothing dies at once; our own
+            # hello (ignored by every worker) keeps the first open alive
+            await collection.insert_one({"origin": self.origin, "kind": "-", "op": "hello", "at": datetime.now(timezone.utc)})
+            cursor = collection.find({"_id": {"$gt": last}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for event in cursor:
+                        if event["_id"] not in self._recent:
+                            await self._apply_logged(event)
+                            self._applied(event["_id"])
+            except OperationFailure as e:
+                if e.code == 136:  # CappedPositionLost: overwritten before we read it
+                    raise PositionLost() from e
+                raise
+            finally:
+                await cursor.close()
+            if self._last_id is not None:
+                last = ObjectId.from_datetime(self._last_id.generation_time - REPLAY_MARGIN)
+
+    async def _watch(self):
+        start = Timestamp(int(self._since.timestamp()), 0)
+        while True:
+            token = self._resume_token
+            options = {"resume_after": token} if token else {"start_at_operation_time": start}
+            try:
+                async with collection.watch([{"$match": {"operationType": "insert"}}], **options) as stream:
+                    async for change in stream:
+                        await self._apply_logged(change["fullDocument"])
+                        self._resume_token = stream.resume_token
+            except OperationFailure as e:
+                if e.code == 286:  # ChangeStreamHistoryLost: the oplog moved past our token
+                    raise PositionLost() from e
+                raise
+
+    async def _run(self, mode: str):
+        consume = self._watch if mode == "changestream" else self._tail
+        while True:
+            try:
+                await consume()
+            except PositionLost:
+                logger.warning("invalidation bus fell behind; resyncing caches and indexes")
+                self._since = datetime.now(timezone.utc) - REPLAY_MARGIN
+                self._last_id, self._resume_token = None, None
+                self._recent.clear()
+                try:
+                    await self.resync()
+                except Exception:
+                    logger.exception("invalidation resync failed")
+            except Exception:
+                logger.exception("invalidation bus stopped reading; reconnecting")
+            await asyncio.sleep(RETRY_DELAY)
+
+    async def _mode(self) -> str:
+        if self.mode != "auto":
+            return self.mode
+        hello = await client.admin.command("hello")
+        # change streams need a replica set or a sharded cluster
+        return "changestream" if hello.get("setName") or hello.get("msg") == "isdbgrid" else "capped"
+
+    def mark(self):
+        # before the in-memory indexes load: events from here on are applied once
+        # start() runs, so a write during the load is not lost
+        self._since = datetime.now(timezone.utc) - REPLAY_MARGIN
+
+    async def start(self):
+        if self.mode == "off" or self._task is not None:
+            return
+        if self._since is None:
+            self.mark()
+        await self._ensure()
+        mode = await self._mode()
+        self._task = asyncio.create_task(self._run(mode))
+        logger.info("invalidation bus started (%s)", mode)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+bus = InvalidationBus(INVALIDATION_BUS, INVALIDATION_BUS_SIZE)
@@ -1,77 +1,333 @@
-from fastapi.encoders import jsonable_encoder
 from app.config import db
+from app.models.migrations import SCHEMA_VERSIONS
 from app.models.itineraries import Itinerary
-from pymongo import ReturnDocument
-import re
+from app.controllers.assets import expand_images, store_images
+from app.controllers import invalidation
+from app.controllers.derived import after_delete, after_write
+from app.controllers.migrations import upgrade_on_read, upgrade_stream
+from app.utils.database import public_reads
+from app.utils.cache import DocumentCache, read_through, read_through_many
+from app.utils.geo import bbox_polygon, derive_route_map
+from app.utils.export import export_cursor, stream_documents
+from app.utils.pagination import faceted_page, paginate, parse_fields
+from app.utils.ids import IdAllocator
+from app.utils.patch import build_patch_update, check_guards, compact_arrays, patch_projection
+from app.utils.serialization import strip_none, to_document
+from app.utils.slugs import SLUG_INDEX, prepare_slug_index, slugify, write_with_unique_slug
+from app.utils.versioning import parse_body_version, versioned_update
+from pymongo import ASCENDING, GEOSPHERE, IndexModel, ReturnDocument, UpdateOne
+from app.utils.instrumentation import traced
 
 collection = db["itineraries"]
+# public list/filter/export/geo reads; single-document reads fill doc_cache right
+# after writes invalidate it, so they stay on the primary
+reads = public_reads(collection)
 
-def _slugify(text: str) -> str:
-    s = text.lower().strip()
-    s = re.sub(r"[^a-z0-9]+", "-", s)
-    s = re.sub(r"-+", "-", s)
-    return s.strip("-")
-
-async def _ensure_unique_slug(base_slug: str, exclude_id: str | None = None) -> str:
-    slug = base_slug
-    i = 2
-    while True:
-        query = {"slug": slug}
-        if exclude_id:
-            query["id"] = {"$ne": exclude_id}
-        exists = await collection.find_one(query)
-        if not exists:
-            return slug
-        slug = f"{base_slug}-{i}"
-        i += 1
+# public sort name -> field; every entry is backed by a (field, _id) index below
+LIST_SORTS = {"created": "_id", "title": "title", "duration": "duration_days"}
+
+# facet name -> document path counted by filter_itineraries
+FILTER_FACETS = {
+    "categories": "categories",
+    "duration_days": "duration_days",
+    "budget_tier": "budget_tier",
+    "best_season": "best_season",
+    "perfect_for": "perfect_for",
+    "filter_keys": "filters.filter_keys",
+}
+
+STOP_LOCATION = "route_map.days.stops.location"
+
+# returned by the nearby/within queries
+GEO_RESULT_FIELDS = ["id", "slug", "title", "subtitle", "cover_image", "destinations", "duration_days", "route_map.map_center"]
+
+@traced
+async def ensure_itinerary_indexes():
+    renamed = await prepare_slug_index(collection)
+    if renamed:
+        await after_write("itinerary", renamed)
+    await collection.create_indexes([
+        IndexModel([("id", ASCENDING)], name="id"),
+        SLUG_INDEX,
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title__id"),
+        IndexModel([("duration_days", ASCENDING), ("_id", ASCENDING)], name="duration_days__id"),
+        # filters: a compound index may hold at most one array (multikey) field
+        IndexModel([("categories", ASCENDING), ("duration_days", ASCENDING)], name="categories_duration"),
+        IndexModel([("budget_tier", ASCENDING), ("duration_days", ASCENDING)], name="budget_tier_duration"),
+        IndexModel([("destinations", ASCENDING)], name="destinations"),
+        IndexModel([("cover_image.asset", ASCENDING)], name="cover_image_asset"),
+        IndexModel([("best_season", ASCENDING)], name="best_season"),
+        IndexModel([("perfect_for", ASCENDING)], name="perfect_for"),
+        IndexModel([("filters.filter_keys", ASCENDING)], name="filters_filter_keys"),
+        # one GeoJSON point per route stop, derived on write
+        IndexModel([(STOP_LOCATION, GEOSPHERE)], name="route_stops_2dsphere"),
+    ])
+
+# rendered single-document reads by id and slug; evicted on update/delete
+doc_cache = DocumentCache()
+
+itinerary_ids = IdAllocator("itineraries_seq", "itinerary_{seq:03d}")
 
 async def _next_itinerary_id() -> str:
-    doc = await db["counters"].find_one_and_update(
-        {"_id": "itineraries_seq"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=ReturnDocument.AFTER,
-    )
-    seq = int(doc.get("seq", 1))
-    return f"itinerary_{seq:03d}"
+    return await itinerary_ids.next_id()
 
+@traced
 async def create_itinerary(data: Itinerary):
-    payload = jsonable_encoder(data, by_alias=True, exclude_none=True)
+    payload = to_document(data)
+    if payload.get("route_map"):
+        derive_route_map(payload["route_map"])
+    [payload] = await store_images([payload])
+    payload["schema_version"] = SCHEMA_VERSIONS["itinerary"]
     if not payload.get("id"):
         payload["id"] = await _next_itinerary_id()
-    if not payload.get("slug") and payload.get("title"):
-        base_slug = _slugify(payload["title"]) or payload["id"]
-        payload["slug"] = await _ensure_unique_slug(base_slug)
-    result = await collection.insert_one(payload)
+    base_slug = slugify(payload.get("slug") or payload.get("title") or "") or payload["id"]
+
+    async def _insert(slug: str):
+        payload["slug"] = slug
+        return await collection.insert_one(payload)
+
+    result = await write_with_unique_slug(collection, base_slug, _insert)
+    await after_write("itinerary", [payload])
     payload["_id"] = str(result.inserted_id)
     return payload
 
-async def get_all_itineraries():
-    items = []
-    async for doc in collection.find():
-        doc["_id"] = str(doc["_id"])  # normalize
-        items.append(doc)
-    return items
+@traced
+async def get_all_itineraries(limit: int, cursor: str | None = None, sort: str | None = None, fields: str | None = None, expand: set[str] = frozenset()):
+    page = await paginate(
+        reads,
+        {},
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+        fields=fields,
+    )
+    if not fields:
+        upgrade_on_read("itinerary", collection, page["items"])
+    if "images" in expand:
+        page["items"] = await expand_images(page["items"])
+    return page
+
+def build_itinerary_filter(
+    categories: list[str] | None = None,
+    destinations: list[str] | None = None,
+    budget_tier: list[str] | None = None,
+    best_season: list[str] | None = None,
+    perfect_for: list[str] | None = None,
+    filter_keys: list[str] | None = None,
+    duration_min: int | None = None,
+    duration_max: int | None = None,
+) -> dict:
+    # any-of within one facet, all-of across facets
+    query = {}
+    for path, values in (
+        ("categories", categories),
+        ("destinations", destinations),
+        ("budget_tier", budget_tier),
+        ("best_season", best_season),
+        ("perfect_for", perfect_for),
+        ("filters.filter_keys", filter_keys),
+    ):
+        if values:
+            query[path] = {"$in": values}
+    duration = {}
+    if duration_min is not None:
+        duration["$gte"] = duration_min
+    if duration_max is not None:
+        duration["$lte"] = duration_max
+    if duration:
+        query["duration_days"] = duration
+    return query
 
-async def get_itinerary(id: str):
-    doc = await collection.find_one({"id": id})
+@traced
+async def filter_itineraries(query: dict, limit: int, cursor: str | None = None, sort: str | None = None, fields: str | None = None, expand: set[str] = frozenset()):
+    page = await faceted_page(
+        reads,
+        query,
+        facets=FILTER_FACETS,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+        fields=fields,
+    )
+    if not fields:
+        upgrade_on_read("itinerary", collection, page["items"])
+    if "images" in expand:
+        page["items"] = await expand_images(page["items"])
+    return page
+
+def export_itineraries(fmt: str = "ndjson", fields: str | None = None):
+    cursor = export_cursor(reads, parse_fields(fields, always=("id",)))
+    if not fields:
+        cursor = upgrade_stream("itinerary", cursor)
+    return stream_documents(cursor, fmt)
+
+async def _load(query: dict, expand: set[str]):
+    doc = await collection.find_one(query)
+    upgrade_on_read("itinerary", collection, [doc])
+    if doc and "images" in expand:
+        [doc] = await expand_images([doc])
+    return doc
+
+@traced
+async def get_itinerary_entry(id: str, expand: set[str] = frozenset()):
+    key = ("id+images" if "images" in expand else "id", id)
+    return await read_through(doc_cache, key, lambda: _load({"id": id}, expand))
+
+async def _load_many(ids: list[str], expand: set[str]) -> list[dict]:
+    docs = await collection.find({"id": {"$in": ids}}).to_list(length=None)
+    upgrade_on_read("itinerary", collection, docs)
+    if "images" in expand:
+        docs = await expand_images(docs)
+    return docs
+
+@traced
+async def get_itinerary_entries(ids: list[str], expand: set[str] = frozenset()):
+    # batch get: cached documents plus one $in for the rest, in the order of ids
+    kind = "id+images" if "images" in expand else "id"
+    return await read_through_many(doc_cache, kind, ids, lambda missing: _load_many(missing, expand))
+
+@traced
+async def get_itinerary_entry_by_slug(slug: str, expand: set[str] = frozenset()):
+    key = ("slug+images" if "images" in expand else "slug", slug)
+    return await read_through(doc_cache, key, lambda: _load({"slug": slug}, expand))
+
+@traced
+async def update_itinerary(id: str, data: dict, expected_version: int | None = None):
+    set_doc = strip_none(data)
+    if expected_version is None:
+        expected_version = parse_body_version(set_doc.get("version"))
+    [set_doc] = await store_images([set_doc])
+    if set_doc.get("route_map"):
+        derive_route_map(set_doc["route_map"])
+    base_slug = None
+    if set_doc.get("slug"):
+        base_slug = slugify(set_doc["slug"])
+    elif set_doc.get("title"):
+        base_slug = slugify(set_doc["title"])
+
+    async def _update(slug: str | None):
+        if slug:
+            set_doc["slug"] = slug
+        return await versioned_update(collection, {"id": id}, {"$set": set_doc}, expected_version)
+
+    if base_slug:
+        doc = await write_with_unique_slug(collection, base_slug, _update, exclude_id=id)
+    else:
+        doc = await _update(None)
+    doc_cache.invalidate(id)
     if doc:
+        await after_write("itinerary", [doc])
         doc["_id"] = str(doc["_id"])  # normalize
     return doc
 
-async def update_itinerary(id: str, data: dict):
-    set_doc = jsonable_encoder(data, by_alias=True, exclude_none=True)
-    if ("title" in set_doc) and (not set_doc.get("slug")):
-        base_slug = _slugify(set_doc["title"]) if set_doc.get("title") else None
-        if base_slug:
-            set_doc["slug"] = await _ensure_unique_slug(base_slug, exclude_id=id)
-    update_doc = {"$set": set_doc}
-    await collection.update_one({"id": id}, update_doc)
-    doc = await collection.find_one({"id": id})
+async def _rederive_route_map(doc: dict) -> dict:
+    # a patch may touch a single stop: recompute the derived fields from the result.
+    # Guarded on version; if another write got in first, it derived its own.
+    route_map = derive_route_map(doc["route_map"])
+    updated = await collection.find_one_and_update(
+        {"id": doc["id"], "version": doc.get("version")},
+        {"$set": {"route_map": route_map}},
+        return_document=ReturnDocument.AFTER,
+    )
+    return updated or doc
+
+@traced
+async def patch_itinerary(id: str, ops: list[dict], expected_version: int | None = None):
+    # JSON Patch ops -> targeted $set/$push/$unset on just the touched paths
+    # paths into discriminated union elements are validated against the stored type
+    projection = patch_projection(Itinerary, ops)
+    stored = None
+    if projection:
+        stored = await collection.find_one({"id": id}, projection)
+        if stored is None:
+            return None
+    update, compact, guards = build_patch_update(Itinerary, ops, stored)
+    [update] = await store_images([update])
+    set_doc = update.setdefault("$set", {})
+    base_slug = None
+    if set_doc.get("slug"):
+        base_slug = slugify(set_doc["slug"])
+    elif set_doc.get("title"):
+        base_slug = slugify(set_doc["title"])
+
+    async def _update(slug: str | None):
+        if slug:
+            set_doc["slug"] = slug
+        return await versioned_update(collection, {"id": id, **guards}, update, expected_version)
+
+    if base_slug:
+        doc = await write_with_unique_slug(collection, base_slug, _update, exclude_id=id)
+    else:
+        doc = await _update(None)
+    if doc is None:
+        await check_guards(collection, {"id": id}, guards)
+    if doc and compact:
+        doc = await compact_arrays(collection, {"id": id}, compact, doc["version"])
+    if doc and doc.get("route_map") and any(op.get("path", "").startswith("/route_map") for op in ops):
+        doc = await _rederive_route_map(doc)
+    doc_cache.invalidate(id)
     if doc:
+        await after_write("itinerary", [doc])
         doc["_id"] = str(doc["_id"])  # normalize
     return doc
 
+@traced
 async def delete_itinerary(id: str):
     res = await collection.delete_one({"id": id})
-    return {"deleted": res.deleted_count == 1}
\ No newline at end of file
+    doc_cache.invalidate(id)
+    await after_delete("itinerary", id)
+    return {"deleted": res.deleted_count == 1}
+
+@traced
+async def nearby_itineraries(lat: float, lng: float, radius_km: float, limit: int):
+    # nearest first; distance_km is to the closest stop of each itinerary
+    pipeline = [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lng, lat]},
+            "key": STOP_LOCATION,
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "distance_km": 1, **{f: 1 for f in GEO_RESULT_FIELDS}}},
+    ]
+    return {"items": await reads.aggregate(pipeline).to_list(length=limit)}
+
+@traced
+async def itineraries_within(bbox: str, limit: int, cursor: str | None = None, sort: str | None = None, fields: str | None = None):
+    query = {STOP_LOCATION: {"$geoWithin": {"$geometry": bbox_polygon(bbox)}}}
+    return await paginate(
+        reads,
+        query,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+        fields=fields or ",".join(GEO_RESULT_FIELDS),
+    )
+
+@traced
+async def backfill_route_maps(batch_size: int = 500) -> int:
+    # derive stop points / totals for documents written before they existed
+    ops, count = [], 0
+    async for doc in collection.find({"route_map": {"$type": "object"}}, {"id": 1, "version": 1, "route_map": 1}):
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "version": doc.get("version")},
+            {"$set": {"route_map": derive_route_map(doc["route_map"])}},
+        ))
+        count += 1
+        if len(ops) >= batch_size:
+            await collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+    doc_cache.clear()
+    await invalidation.bus.publish("itinerary", "clear", ["*"])
+    return count
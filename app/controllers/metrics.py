@@ -0,0 +1,187 @@
+# controllers/metrics.py
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import db, METRICS_FLUSH_INTERVAL, METRICS_FLUSH_MAX_KEYS
+from app.models.metrics import EngagementEvent
+from app.utils.database import public_reads
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+collections = {
+    "itinerary": db["itinerary_metrics"],
+    "travelogue": db["travelogue_metrics"],
+}
+# counters are flushed every METRICS_FLUSH_INTERVAL anyway: reads may lag a little more
+reads = {kind: public_reads(collection) for kind, collection in collections.items()}
+
+# event -> counter field on the ItineraryMetrics / TravelogueMetrics rows
+EVENT_FIELDS = {
+    "view": "views",
+    "like": "likes",
+    "dislike": "dislikes",
+    "share": "shares",
+    "save": "saves",
+    "feedback_inspiring": "feedback_inspiring",
+    "feedback_not_useful": "feedback_not_useful",
+}
+COUNTERS = {
+    "itinerary": ["views", "likes", "shares", "saves", "feedback_inspiring", "feedback_not_useful"],
+    "travelogue": ["views", "likes", "dislikes", "shares"],
+}
+# running sums behind avg_read_time_seconds
+READ_TIME_FIELDS = ["read_time_total", "read_time_count"]
+TOTAL = "TOTAL"
+_ROW_NAMESPACE = uuid.UUID("6f1c2a1e-8f0b-4c63-9a53-0b6f3c1d7e21")
+
+@traced
+async def ensure_metrics_indexes():
+    for collection in collections.values():
+        await collection.create_indexes([
+            IndexModel([("content_id", ASCENDING), ("date_key", ASCENDING)], name="content_date", unique=True),
+        ])
+
+def _row_id(content_type: str, content_id: str, date_key: str) -> str:
+    if content_type == "travelogue":
+        # TravelogueMetrics.id is a UUID: derive it so every worker upserts the same row
+        return str(uuid.uuid5(_ROW_NAMESPACE, f"{content_id}:{date_key}"))
+    return f"{content_id}:{date_key}"
+
+class MetricsBuffer:
+    # In-memory counters per (content_type, content_id, date_key). Every event is
+    # one dict increment; Mongo sees one upsert per touched row per flush, for the
+    # day row and the TOTAL row, however many events arrived in between.
+
+    def __init__(self):
+        self._counts: dict[tuple[str, str, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, event: EngagementEvent, date_key: str):
+        field = EVENT_FIELDS[event.event]
+        if field not in COUNTERS[event.content_type]:
+            return  # e.g. "save" on a travelogue: the row has no such counter
+        for key in ((event.content_type, event.content_id, date_key), (event.content_type, event.content_id, TOTAL)):
+            counts = self._counts[key]
+            counts[field] += event.count
+            if event.event == "view" and event.read_time_seconds is not None:
+                counts["read_time_total"] += event.read_time_seconds
+                counts["read_time_count"] += 1
+
+    def _merge(self, pending: dict):
+        # put counts of a failed flush back so the next flush retries them
+        for key, counts in pending.items():
+            for field, n in counts.items():
+                self._counts[key][field] += n
+
+    @traced
+    async def flush(self) -> int:
+        async with self._lock:
+            pending, self._counts = self._counts, defaultdict(lambda: defaultdict(int))
+            if not pending:
+                return 0
+            now = datetime.now(timezone.utc).isoformat()
+            by_type: dict[str, list] = defaultdict(list)
+            for key, counts in pending.items():
+                by_type[key[0]].append((key, counts))
+
+            # one failing type does not hold back the others; its rows are retried
+            written, error = 0, None
+            for content_type, rows in by_type.items():
+                ops = [_upsert(key, counts, now) for key, counts in rows]
+                try:
+                    await collections[content_type].bulk_write(ops, ordered=False)
+                    written += len(ops)
+                except BulkWriteError as exc:
+                    failed = {err["index"] for err in exc.details.get("writeErrors", [])}
+                    self._merge({rows[i][0]: rows[i][1] for i in failed})
+                    written += len(ops) - len(failed)
+                except Exception as exc:
+                    self._merge(dict(rows))
+                    error = error or exc
+            if error is not None:
+                raise error
+            return written
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # shielded: stop() cancelling the loop must not abort a write half
+                # done, its counts are already out of the buffer
+                await asyncio.shield(self.flush())
+            except Exception:
+                logger.warning("engagement flush failed; counts kept for the next one", exc_info=True)
+
+    def start(self, interval: float = METRICS_FLUSH_INTERVAL):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # waits on the lock for a flush still running, then writes what is left
+        await self.flush()
+
+def _upsert(key: tuple[str, str, str], counts: dict[str, int], now: str) -> UpdateOne:
+    content_type, content_id, date_key = key
+    counters = COUNTERS[content_type]
+
+    def _plus(field: str):
+        return {"$add": [{"$ifNull": [f"${field}", 0]}, counts.get(field, 0)]}
+
+    # pipeline update: the increments and the derived fields land in the same write
+    increments = {field: _plus(field) for field in counters + READ_TIME_FIELDS}
+    increments["id"] = {"$ifNull": ["$id", _row_id(content_type, content_id, date_key)]}
+    increments["updated_at"] = {"$literal": now}
+    engaged = [{"$ifNull": [f"${f}", 0]} for f in ("likes", "shares", "saves") if f in counters]
+    derived = {
+        "engagement_rate": {
+            "$cond": [{"$gt": ["$views", 0]}, {"$round": [{"$divide": [{"$add": engaged}, "$views"]}, 4]}, 0.0]
+        },
+    }
+    if content_type == "itinerary":
+        derived["avg_read_time_seconds"] = {
+            "$cond": [
+                {"$gt": ["$read_time_count", 0]},
+                {"$toInt": {"$round": [{"$divide": ["$read_time_total", "$read_time_count"]}, 0]}},
+                0,
+            ]
+        }
+    return UpdateOne(
+        {"content_id": content_id, "date_key": date_key},
+        [{"$set": increments}, {"$set": derived}],
+        upsert=True,
+    )
+
+buffer = MetricsBuffer()
+
+@traced
+async def record_events(events: list[EngagementEvent]) -> dict:
+    date_key = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    for event in events:
+        buffer.add(event, date_key)
+    if len(buffer) >= METRICS_FLUSH_MAX_KEYS:
+        # a burst over many distinct rows: flush now rather than grow unbounded
+        await buffer.flush()
+    return {"accepted": len(events)}
+
+@traced
+async def get_metrics(content_type: str, content_id: str, date_key: str = TOTAL):
+    doc = await reads[content_type].find_one({"content_id": content_id, "date_key": date_key})
+    if doc:
+        doc["_id"] = str(doc["_id"])  # normalize
+    return doc
@@ -0,0 +1,231 @@
+# controllers/migrations.py
+import asyncio
+import copy
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.config import db, MIGRATION_BATCH_PAUSE, MIGRATION_BATCH_SIZE, MIGRATION_LEASE_SECONDS
+from app.models.migrations import SCHEMA_VERSIONS, outdated_query, upgrade
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+# Documents are upgraded to the current schema_version in memory on read and
+# written back in the background; the migrator converts the rest in throttled
+# batches. One progress row per kind:
+#   {_id: kind, target, last_id, migrated, skipped, done, owner, lease_until, updated_at}
+progress = db["schema_migrations"]
+
+def _sources() -> dict:
+    from app.controllers import itineraries, travelogues
+
+    return {"itinerary": itineraries.collection, "travelogue": travelogues.collection}
+
+def _upgrade_op(kind: str, doc: dict) -> UpdateOne | None:
+    # upgrades doc in place; -> the write-back of the changed top-level fields,
+    # guarded so a concurrent edit or upgrade is never overwritten (version is
+    # not bumped: the content is unchanged, editors' If-Match stays valid)
+    if doc.get("schema_version", 1) >= SCHEMA_VERSIONS[kind]:
+        return None
+    before = copy.deepcopy(doc)
+    upgrade(kind, doc)
+    changed = {k: v for k, v in doc.items() if k != "_id" and before.get(k) != v}
+    # list pages carry a string _id; the id field is unique too
+    query = {"id": doc["id"]} if doc.get("id") else {"_id": doc["_id"]}
+    query.update(version=before.get("version"), schema_version=before.get("schema_version"))
+    return UpdateOne(query, {"$set": changed})
+
+_writebacks: set[asyncio.Task] = set()
+
+async def _write_back(collection, ops: list[UpdateOne]):
+    try:
+        await collection.bulk_write(ops, ordered=False)
+    except Exception:
+        # the next read upgrades again; the migrator catches the rest
+        logger.warning("schema write-back of %d documents failed", len(ops), exc_info=True)
+
+def upgrade_on_read(kind: str, collection, docs: list[dict]) -> list[dict]:
+    # full documents only (no projection). Current documents cost one dict lookup;
+    # outdated ones are upgraded here and written back without delaying the response
+    ops = [op for doc in docs if doc and (op := _upgrade_op(kind, doc))]
+    if ops:
+        task = asyncio.create_task(_write_back(collection, ops))
+        _writebacks.add(task)
+        task.add_done_callback(_writebacks.discard)
+    return docs
+
+async def upgrade_stream(kind: str, cursor):
+    # exports: upgraded in memory only, the migrator writes them
+    async for doc in cursor:
+        _upgrade_op(kind, doc)
+        yield doc
+
+async def drain_writebacks():
+    if _writebacks:
+        await asyncio.gather(*list(_writebacks), return_exceptions=True)
+
+class SchemaMigrator:
+    # One worker migrates a kind at a time, holding a lease on its progress row
+    # that is renewed every batch; if it dies, another worker resumes from
+    # last_id once the lease expires. Batches are throttled by batch_size and pause.
+
+    def __init__(self, batch_size: int = MIGRATION_BATCH_SIZE, pause: float = MIGRATION_BATCH_PAUSE,
+                 lease_seconds: float = MIGRATION_LEASE_SECONDS):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: asyncio.Task | None = None
+
+    async def _claim(self, kind: str) -> dict | None:
+        now = datetime.now(timezone.utc)
+        target = SCHEMA_VERSIONS[kind]
+        try:
+            row = await progress.find_one_and_update(
+                {"_id": kind, "$or": [
+                    {"owner": self.owner},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}},
+                ]},
+                {
+                    "$set": {"owner": self.owner, "lease_until": now + self.lease},
+                    "$setOnInsert": {"target": target, "last_id": None, "migrated": 0, "skipped": 0, "done": False},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None  # leased by another worker
+        if row["target"] > target:
+            await self._release(kind)  # a newer deploy owns this migration
+            return None
+        if row["target"] < target:
+            # new steps since the last run: every document is behind again
+            row.update(target=target, last_id=None, migrated=0, skipped=0, done=False)
+            await progress.update_one(
+                {"_id": kind, "owner": self.owner},
+                {"$set": {k: row[k] for k in ("target", "last_id", "migrated", "skipped", "done")}},
+            )
+        return row
+
+    async def _release(self, kind: str):
+        await progress.update_one(
+            {"_id": kind, "owner": self.owner}, {"$set": {"lease_until": datetime.now(timezone.utc)}}
+        )
+
+    async def _checkpoint(self, kind: str, fields: dict, counts: dict) -> bool:
+        now = datetime.now(timezone.utc)
+        update = {"$set": {**fields, "lease_until": now + self.lease, "updated_at": now.isoformat()}}
+        if counts:
+            update["$inc"] = counts
+        res = await progress.update_one({"_id": kind, "owner": self.owner}, update)
+        return res.matched_count == 1  # False: the lease was lost to another worker
+
+    @traced
+    async def migrate(self, kind: str, collection) -> dict:
+        # -> this run's counts; resumes after the last checkpointed _id
+        row = await self._claim(kind)
+        if row is None:
+            return {"status": "leased"}
+        if row["done"]:
+            return {"status": "done"}
+        last_id, migrated, skipped = row["last_id"], 0, 0
+        while True:
+            query = outdated_query(kind)
+            if last_id is not None:
+                query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+            docs = await collection.find(query).sort("_id", 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not docs:
+                break
+            ops = [op for doc in docs if (op := _upgrade_op(kind, doc))]
+            modified = 0
+            if ops:
+                modified = (await collection.bulk_write(ops, ordered=False)).modified_count
+            # skipped: edited or upgraded on read since the batch was read; a
+            # later read upgrades whatever is still behind
+            migrated, skipped, last_id = migrated + modified, skipped + len(ops) - modified, docs[-1]["_id"]
+            if not await self._checkpoint(kind, {"last_id": last_id}, {"migrated": modified, "skipped": len(ops) - modified}):
+                return {"status": "lost lease", "migrated": migrated, "skipped": skipped}
+            if self.pause:
+                await asyncio.sleep(self.pause)
+        await self._checkpoint(kind, {"done": True}, {})
+        await self._release(kind)
+        logger.info("schema migration of %s to v%d done: %d migrated", kind, SCHEMA_VERSIONS[kind], migrated)
+        return {"status": "done", "migrated": migrated, "skipped": skipped}
+
+    @traced
+    async def run_once(self, name: str, job) -> dict | None:
+        # a one-off job (e.g. a backfill) run by one worker, under a lease renewed
+        # while it runs, and recorded done in its progress row so it never reruns.
+        # -> the job's result, or None if it is done or leased by another worker
+        now = datetime.now(timezone.utc)
+        try:
+            await progress.find_one_and_update(
+                {"_id": name, "done": {"$ne": True}, "$or": [
+                    {"owner": self.owner},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}},
+                ]},
+                {"$set": {"owner": self.owner, "lease_until": now + self.lease}, "$setOnInsert": {"done": False}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+
+        async def renew():
+            while True:
+                await asyncio.sleep(self.lease.total_seconds() / 2)
+                await self._checkpoint(name, {}, {})
+
+        renewing = asyncio.create_task(renew())
+        try:
+            result = await job()
+        except BaseException:
+            await self._release(name)
+            raise
+        finally:
+            renewing.cancel()
+        await self._checkpoint(name, {"done": True, "result": result}, {})
+        await self._release(name)
+        return result
+
+    async def migrate_all(self) -> dict:
+        return {kind: await self.migrate(kind, collection) for kind, collection in _sources().items()}
+
+    async def _run(self):
+        # retried until every kind is done (another worker may hold a lease)
+        while True:
+            try:
+                results = await self.migrate_all()
+                if all(r["status"] == "done" for r in results.values()):
+                    return
+            except Exception:
+                logger.exception("schema migration batch failed; retrying")
+            await asyncio.sleep(self.lease.total_seconds())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            for kind in SCHEMA_VERSIONS:
+                await self._release(kind)  # let another worker resume right away
+        await drain_writebacks()
+
+@traced
+async def reset_migrations():
+    # next run starts over from the first document (e.g. to retry skipped ones)
+    await progress.update_many({}, {"$set": {"last_id": None, "done": False}})
+
+migrator = SchemaMigrator()
@@ -0,0 +1,197 @@
+# controllers/published.py
+import logging
+import time
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from app.config import db, PUBLISHED_CACHE_SIZE, PUBLISHED_CACHE_TTL
+from app.controllers import derived, feed, invalidation
+from app.controllers.assets import expand_images
+from app.controllers.cards import build_card
+from app.controllers.migrations import migrator, upgrade_on_read
+from app.models.itineraries import Itinerary
+from app.models.travoulage import Travelogue
+from app.utils.cache import CachedDocument, DocumentCache, make_etag, read_through
+from app.utils.geo import derive_route_map
+from app.utils.serialization import dumps, to_document
+from app.utils.versioning import now_iso, versioned_update
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+# Publish pipeline: publishing validates a document once, recomputes its derived
+# fields, expands its images and stores the rendered JSON as an immutable snapshot
+# keyed by slug. Public reads are one _id lookup returning the stored bytes; edits
+# to the source document do not reach them until the next publish.
+collections = {
+    "itinerary": db["published_itineraries"],
+    "travelogue": db["published_travelogues"],
+}
+MODELS = {"itinerary": Itinerary, "travelogue": Travelogue}
+
+# editor bookkeeping left out of the public document
+PRIVATE_FIELDS = ("updated_by", "deleted_at")
+
+# snapshot bodies per kind, keyed ("slug", slug); invalidated by document id
+caches = {kind: DocumentCache(PUBLISHED_CACHE_SIZE) for kind in collections}
+
+@traced
+async def ensure_published_indexes():
+    for collection in collections.values():
+        await collection.create_indexes([
+            IndexModel([("id", ASCENDING)], name="id"),
+            IndexModel([("published_at", DESCENDING), ("_id", DESCENDING)], name="published_at__id"),
+        ])
+
+def _sources() -> dict:
+    from app.controllers import itineraries, travelogues
+
+    return {"itinerary": itineraries, "travelogue": travelogues}
+
+def render(kind: str, doc: dict) -> dict:
+    # stored document (images expanded) -> the public document; 422 if it no
+    # longer validates, so a broken draft can never replace a live snapshot
+    try:
+        model = MODELS[kind].model_validate({k: v for k, v in doc.items() if k != "_id"})
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "document cannot be published",
+                "errors": e.errors(include_url=False, include_input=False, include_context=False),
+            },
+        )
+    rendered = to_document(model)
+    for field in PRIVATE_FIELDS:
+        rendered.pop(field, None)
+    if rendered.get("route_map"):
+        derive_route_map(rendered["route_map"])
+    return rendered
+
+@traced
+async def publish(kind: str, id: str, expected_version: int | None = None, announce: bool = True):
+    # announce=False leaves the feed and other workers to their next refresh (backfill)
+    module = _sources()[kind]
+    doc = await module.collection.find_one({"id": id})
+    if doc is None:
+        return None
+    upgrade_on_read(kind, module.collection, [doc])  # snapshots are always current schema
+    version = doc.get("version", 1)
+    if expected_version is not None and expected_version != version:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "version conflict", "expected_version": expected_version, "current_version": version},
+        )
+    if not doc.get("slug"):
+        raise HTTPException(status_code=422, detail="a slug is required to publish")
+    [expanded] = await expand_images([doc])
+    rendered = render(kind, expanded)
+    if kind == "itinerary" and doc.get("status") != "published":
+        # status lives on the source; guarded so the snapshot is exactly the version checked above.
+        # Already published: only the snapshot is written, the source version stays
+        updated = await versioned_update(module.collection, {"id": id}, {"$set": {"status": "published"}}, version)
+        if updated is None:
+            return None
+        module.doc_cache.invalidate(id)
+        await derived.after_write(kind, [updated])
+        rendered.update(status="published", version=updated["version"], last_updated=updated["last_updated"])
+        expanded.update(status="published")
+    body = dumps(rendered)
+    collection = collections[kind]
+    previous = await collection.find_one({"id": id}, {"first_published_at": 1})
+    now = now_iso()
+    snapshot = {
+        "_id": rendered["slug"],
+        "id": id,
+        "version": rendered.get("version", 1),
+        "published_at": now,
+        # republishing an edit keeps the original date, so the feed does not re-surface it as new
+        "first_published_at": (previous or {}).get("first_published_at", now),
+        "body": body,
+        "etag": make_etag(body),
+        "card": build_card(kind, expanded),  # listing view of the same version
+    }
+    await collection.replace_one({"_id": snapshot["_id"]}, snapshot, upsert=True)
+    # a publish after a slug change retires the snapshot under the old slug
+    await collection.delete_many({"id": id, "_id": {"$ne": snapshot["_id"]}})
+    caches[kind].invalidate(id)
+    if announce:
+        await feed.service.publish(kind, snapshot)
+        await invalidation.bus.publish(kind, "publish", [id])
+    return {
+        "id": id,
+        "slug": snapshot["_id"],
+        "version": snapshot["version"],
+        "published_at": snapshot["published_at"],
+        "etag": snapshot["etag"],
+    }
+
+@traced
+async def remove_published(kind: str, id: str) -> bool:
+    res = await collections[kind].delete_many({"id": id})
+    caches[kind].invalidate(id)
+    feed.service.remove(kind, id)
+    await invalidation.bus.publish(kind, "unpublish", [id])
+    return res.deleted_count > 0
+
+@traced
+async def unpublish(kind: str, id: str):
+    module = _sources()[kind]
+    removed = await remove_published(kind, id)
+    if kind == "itinerary":
+        doc = await versioned_update(module.collection, {"id": id, "status": "published"}, {"$set": {"status": "draft"}})
+        if doc:
+            module.doc_cache.invalidate(id)
+            await derived.after_write(kind, [doc])
+    return {"unpublished": removed}
+
+@traced
+async def backfill_published() -> dict:
+    # content that was live before snapshots existed: itineraries already marked
+    # published and every travelogue (they have no status). Documents that no
+    # longer validate are logged and skipped; publish them once fixed.
+    counts = {}
+    for kind, module in _sources().items():
+        have = set(await collections[kind].distinct("id"))
+        query = {"status": "published"} if kind == "itinerary" else {}
+        published = skipped = 0
+        async for doc in module.collection.find(query, {"id": 1}):
+            if doc["id"] in have:
+                continue
+            try:
+                if await publish(kind, doc["id"], announce=False) is not None:
+                    published += 1
+            except HTTPException as e:
+                skipped += 1
+                logger.warning("%s %s not backfilled: %s", kind, doc["id"], e.detail)
+        counts[kind] = {"published": published, "skipped": skipped}
+    return counts
+
+@traced
+async def ensure_published_backfill():
+    # once per deployment, before the feed loads: one worker takes the migration
+    # lease and records completion, the others skip it and see the snapshots on
+    # their next feed refresh. Later gaps: python -m app.cli backfill-published
+    try:
+        counts = await migrator.run_once("published-backfill", backfill_published)
+    except Exception:
+        logger.exception("published backfill failed; retried on the next start")
+        return
+    if counts is not None:
+        logger.info("snapshotted published content: %s", counts)
+
+def _entry(record: dict) -> CachedDocument:
+    # the stored body is served as-is: no decode, validation or re-encode per read
+    return CachedDocument(
+        record["id"], record["_id"], record["body"], record["etag"], time.monotonic() + PUBLISHED_CACHE_TTL
+    )
+
+@traced
+async def get_published(kind: str, slug: str):
+    # primary, like the doc cache fills: a publish invalidates and the refill must see it
+    return await read_through(
+        caches[kind],
+        ("slug", slug),
+        lambda: collections[kind].find_one({"_id": slug}, {"id": 1, "body": 1, "etag": 1}),
+        build=_entry,
+    )
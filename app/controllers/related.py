@@ -0,0 +1,290 @@
+# controllers/related.py
+import asyncio
+import logging
+from pymongo import DeleteOne, ReplaceOne
+from app.config import db, RELATED_TOP_K
+from app.controllers.assets import expand_images
+from app.utils.database import public_reads
+from app.utils.similarity import FeatureIndex, top_k
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+# Related itineraries/travelogues per document, precomputed from shared
+# destinations, categories, perfect_for, seasons and tags. Lists are stored in
+# related_content (one document per source, _id "<kind>:<id>") and refreshed for
+# the changed document and the neighbours whose lists it can enter or leave.
+collection = db["related_content"]
+reads = public_reads(collection)
+
+KINDS = ("itinerary", "travelogue")
+LIST_FIELDS = {"itinerary": "itineraries", "travelogue": "travelogues"}
+
+# the source fields _features / _item read
+RELATED_SOURCE_FIELDS = [
+    "id", "slug", "title", "destinations", "categories", "perfect_for", "best_season", "filters",
+    "filter_keys", "content_blocks", "cover_image", "author",
+]
+
+def _key(kind: str, id: str) -> str:
+    return f"{kind}:{id}"
+
+def _norm(value) -> str:
+    return str(value).strip().lower()
+
+def _features(kind: str, doc: dict) -> set[str]:
+    feats = {f"dest:{_norm(d)}" for d in doc.get("destinations") or []}
+    feats |= {f"cat:{_norm(c)}" for c in doc.get("categories") or []}
+    if kind == "itinerary":
+        filters = doc.get("filters") or {}
+        feats |= {f"for:{_norm(p)}" for p in doc.get("perfect_for") or filters.get("perfect_for") or []}
+        feats |= {f"season:{_norm(s)}" for s in doc.get("best_season") or filters.get("best_season") or []}
+        feats |= {f"tag:{_norm(t)}" for t in filters.get("filter_keys") or []}
+    else:
+        filters = doc.get("filter_keys") or {}
+        feats |= {f"for:{_norm(p)}" for p in filters.get("perfect_for") or []}
+        feats |= {f"season:{_norm(s)}" for s in filters.get("season") or []}
+        feats |= {f"tag:{_norm(t)}" for t in filters.get("tags") or []}
+        for block in doc.get("content_blocks") or []:
+            if block.get("type") == "tags":
+                feats |= {f"tag:{_norm(t)}" for t in block.get("items") or []}
+    return feats
+
+# read_time on travelogue items: words in the text-bearing blocks at this pace
+READ_WORDS_PER_MINUTE = 200
+
+def _read_time(doc: dict) -> str:
+    words = 0
+    for block in doc.get("content_blocks") or []:
+        words += len(str(block.get("content") or "").split()) + len(str(block.get("description") or "").split())
+        words += sum(len(str(n.get("content") or "").split()) for n in block.get("notes") or [] if isinstance(n, dict))
+    return f"{max(round(words / READ_WORDS_PER_MINUTE), 1)} min read"
+
+def _item(kind: str, doc: dict) -> dict:
+    # a RelatedItineraryItem / RelatedTravelogueItem (plus kind, slug and score for
+    # linking); the travelogue thumbnail is the cover ImageAsset, kept as the stored
+    # reference and expanded by get_related. No source document has a rating, and
+    # itineraries have no author, so those fields are left out.
+    item = {"kind": kind, "id": doc["id"], "slug": doc.get("slug"), "title": doc.get("title")}
+    cover = doc.get("cover_image") or {}
+    if kind == "itinerary":
+        if cover.get("image_url"):
+            item["thumbnail"] = cover["image_url"]
+        return item
+    if cover:
+        item["thumbnail"] = cover
+    if doc.get("categories"):
+        item["category"] = doc["categories"][0]
+    if doc.get("author"):
+        item["author"] = doc["author"].get("name")
+    item["read_time"] = _read_time(doc)
+    return item
+
+class RelatedEngine:
+    def __init__(self, k: int):
+        self.k = k
+        self.index = FeatureIndex()
+        self.items: dict[str, dict] = {}  # doc key -> display fields
+        # doc key -> {target kind: [(other key, score), ...]} as last written
+        self.lists: dict[str, dict[str, list[tuple[str, float]]]] = {}
+
+    def _compute(self, key: str) -> dict[str, list[tuple[str, float]]]:
+        scores = self.index.scores(key)
+        return {
+            kind: top_k(scores, self.k, lambda other, kind=kind: other.startswith(kind + ":"))
+            for kind in KINDS
+        }
+
+    def _row(self, key: str) -> dict:
+        kind, id = key.split(":", 1)
+        row = {"_id": key, "kind": kind, "id": id}
+        for target, ranked in self.lists[key].items():
+            row[LIST_FIELDS[target]] = [{**self.items[other], "score": round(score, 4)} for other, score in ranked]
+        return row
+
+    def _affected(self, key: str, features) -> set[str]:
+        # neighbours whose list holds key, or that key now outranks
+        target = key.split(":", 1)[0]
+        scores = self.index.scores(key) if key in self.index.features else {}
+        out = set()
+        for other in self.index.neighbours(features):
+            current = self.lists.get(other, {}).get(target, [])
+            if any(k == key for k, _ in current):
+                out.add(other)
+            elif other in scores and (len(current) < self.k or scores[other] > current[-1][1]):
+                out.add(other)
+        out.discard(key)
+        return out
+
+    def update(self, kind: str, docs: list[dict]) -> set[str]:
+        # -> keys whose stored list changed
+        changed = set()
+        for doc in docs:
+            if not doc or not doc.get("id"):
+                continue
+            key = _key(kind, doc["id"])
+            new = _features(kind, doc)
+            old = self.index.put(key, new)
+            renamed = self.items.get(key) != (item := _item(kind, doc))
+            self.items[key] = item
+            affected = self._affected(key, old | new)
+            if renamed:
+                # display fields changed: every list showing key is rewritten
+                affected |= {o for o in self.index.neighbours(old | new) if key in dict(self.lists.get(o, {}).get(kind, []))}
+            for other in affected | {key}:
+                self.lists[other] = self._compute(other)
+                changed.add(other)
+        return changed
+
+    def remove(self, kind: str, id: str) -> set[str]:
+        key = _key(kind, id)
+        old = self.index.features.get(key, frozenset())
+        affected = {o for o in self.index.neighbours(old) if key in dict(self.lists.get(o, {}).get(kind, []))}
+        self.index.remove(key)
+        self.items.pop(key, None)
+        self.lists.pop(key, None)
+        for other in affected:
+            self.lists[other] = self._compute(other)
+        return affected
+
+    async def write(self, keys: set[str], deleted: str | None = None):
+        ops = [ReplaceOne({"_id": key}, self._row(key), upsert=True) for key in keys if key in self.lists]
+        if deleted:
+            ops.append(DeleteOne({"_id": deleted}))
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+
+engine = RelatedEngine(RELATED_TOP_K)
+
+class RelatedUpdater:
+    # Recomputes run off the request path: a write queues its documents and one
+    # task applies them in order, scoring in a thread so the loop keeps serving.
+    # Everything that touches the engine holds the lock, so the thread never races
+    # a reload. Until start() (CLI, scripts) changes are applied inline.
+    def __init__(self, engine: RelatedEngine):
+        self.engine = engine
+        self.lock = asyncio.Lock()
+        self.queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @traced
+    async def apply(self, op: str, kind: str, arg, write: bool = True):
+        async with self.lock:
+            if op == "update":
+                keys, deleted = await asyncio.to_thread(self.engine.update, kind, arg), None
+            else:
+                keys, deleted = await asyncio.to_thread(self.engine.remove, kind, arg), _key(kind, arg)
+            if write:
+                await self.engine.write(keys, deleted=deleted)
+
+    async def submit(self, op: str, kind: str, arg, write: bool = True):
+        if self._task is None:
+            await self.apply(op, kind, arg, write)
+        else:
+            self.queue.put_nowait((op, kind, arg, write))
+
+    async def _run(self):
+        while True:
+            op, kind, arg, write = await self.queue.get()
+            try:
+                await self.apply(op, kind, arg, write)
+            except Exception:
+                # the lists stay stale until the next change or rebuild-related
+                logger.exception("related lists not refreshed after %s %s", kind, op)
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # queued changes are applied before shutdown
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+updater = RelatedUpdater(engine)
+
+@traced
+async def refresh_related(kind: str, docs: list[dict]):
+    await updater.submit("update", kind, docs)
+
+@traced
+async def remove_related(kind: str, id: str):
+    await updater.submit("remove", kind, id)
+
+def _sources() -> dict:
+    # imported here: the content controllers import derived, which imports this module
+    from app.controllers import itineraries, travelogues
+    return {"itinerary": itineraries.collection, "travelogue": travelogues.collection}
+
+async def _load_features(sources: dict):
+    engine.index = FeatureIndex()
+    engine.items.clear()
+    for kind, source in sources.items():
+        async for doc in source.find({}, RELATED_SOURCE_FIELDS):
+            key = _key(kind, doc["id"])
+            engine.index.put(key, _features(kind, doc))
+            engine.items[key] = _item(kind, doc)
+
+@traced
+async def load_related(batch_size: int = 500):
+    # features come from the (small) projected fields; stored lists are reused and
+    # only documents without one are computed
+    async with updater.lock:
+        await _load_related(batch_size)
+
+async def _load_related(batch_size: int):
+    await _load_features(_sources())
+    engine.lists.clear()
+    async for row in collection.find({}):
+        if row["_id"] in engine.items:
+            engine.lists[row["_id"]] = {
+                target: [
+                    (_key(i["kind"], i["id"]), i["score"]) for i in row.get(field) or []
+                    if _key(i["kind"], i["id"]) in engine.items
+                ]
+                for target, field in LIST_FIELDS.items()
+            }
+    missing = [key for key in engine.items if key not in engine.lists]
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        for key in batch:
+            engine.lists[key] = engine._compute(key)
+        await engine.write(set(batch))
+
+@traced
+async def rebuild_related(batch_size: int = 500) -> int:
+    async with updater.lock:
+        return await _rebuild_related(batch_size)
+
+async def _rebuild_related(batch_size: int) -> int:
+    await _load_features(_sources())
+    engine.lists.clear()
+    keys = list(engine.items)
+    for i in range(0, len(keys), batch_size):
+        batch = keys[i:i + batch_size]
+        for key in batch:
+            engine.lists[key] = engine._compute(key)
+        await engine.write(set(batch))
+    orphans = [r["_id"] async for r in collection.find({}, {"_id": 1}) if r["_id"] not in engine.items]
+    for i in range(0, len(orphans), batch_size):
+        await collection.delete_many({"_id": {"$in": orphans[i:i + batch_size]}})
+    return len(keys)
+
+@traced
+async def get_related(kind: str, id: str, limit: int | None = None):
+    row = await reads.find_one({"_id": _key(kind, id)}, {"_id": 0})
+    if row and limit:
+        for field in LIST_FIELDS.values():
+            row[field] = (row.get(field) or [])[:limit]
+    if row:
+        [row] = await expand_images([row])  # travelogue thumbnails are asset references
+    return row
@@ -0,0 +1,210 @@
+# controllers/search.py
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from app.config import SEARCH_SNAPSHOT_INTERVAL, SEARCH_SNAPSHOT_PATH
+from app.utils.search_index import InvertedIndex
+from app.utils.serialization import dumps, loads
+from app.utils.instrumentation import traced
+
+# Full-text search over itineraries and travelogues, held in memory per worker.
+# Writes go through derived.after_write/after_delete; a snapshot on disk lets a
+# restart skip the full Mongo scan and only catch up on what changed since.
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_CATCH_UP_MARGIN = 60  # seconds
+
+index = InvertedIndex()
+
+# the source fields _fields reads
+SEARCH_SOURCE_FIELDS = [
+    "id", "slug", "title", "subtitle", "destinations", "categories", "highlights",
+    "daywise_plan", "travel_notes", "content_blocks", "status", "published_at",
+]
+
+def _key(kind: str, id: str) -> str:
+    return f"{kind}:{id}"
+
+def _itinerary_fields(doc: dict) -> list[tuple[str, float]]:
+    fields = [(doc.get("subtitle") or "", 1.5)]
+    fields += [(h, 1.5) for h in doc.get("highlights") or []]
+    for day in doc.get("daywise_plan") or []:
+        fields.append((day.get("title") or "", 1.5))
+        for a in day.get("activities") or []:
+            fields.append((a.get("title") or "", 1.5))
+            fields.append((a.get("subtitle") or "", 1.0))
+            fields.append((a.get("location") or "", 1.0))
+            fields += [(t, 1.0) for t in a.get("activitytags") or []]
+    fields += [(n.get("text") or "", 1.0) for n in doc.get("travel_notes") or []]
+    return fields
+
+def _travelogue_fields(doc: dict) -> list[tuple[str, float]]:
+    fields = [(doc.get("subtitle") or "", 1.5)]
+    for block in doc.get("content_blocks") or []:
+        btype = block.get("type")
+        if btype in ("text", "quote", "closing_quote"):
+            fields.append((block.get("content") or "", 1.0))
+        elif btype == "tags":
+            fields += [(t, 1.5) for t in block.get("items") or []]
+        elif btype == "image":
+            fields.append((block.get("caption") or "", 0.5))
+        elif btype == "taste_memories":
+            fields += [(f, 1.0) for f in block.get("foods") or []]
+            fields.append((block.get("description") or "", 1.0))
+        elif btype == "travel_notes":
+            fields += [(n.get("content") or "", 1.0) for n in block.get("notes") or []]
+            fields += [(t, 1.0) for t in block.get("tags") or []]
+        if block.get("title"):
+            fields.append((block["title"], 1.0))
+    return fields
+
+def _fields(kind: str, doc: dict) -> list[tuple[str, float]]:
+    fields = [(doc.get("title") or "", 3.0)]
+    fields += [(d, 2.5) for d in doc.get("destinations") or []]
+    fields += [(c, 2.0) for c in doc.get("categories") or []]
+    extra = _itinerary_fields(doc) if kind == "itinerary" else _travelogue_fields(doc)
+    return fields + extra
+
+def _meta(kind: str, doc: dict) -> dict:
+    meta = {"kind": kind, "id": doc["id"], "slug": doc.get("slug"), "title": doc.get("title")}
+    if kind == "itinerary":
+        meta["status"] = doc.get("status")
+    else:
+        meta["published_at"] = doc.get("published_at")
+    return meta
+
+class SearchService:
+    def __init__(self, index: InvertedIndex, path: str, interval: float):
+        self.index = index
+        self.path = path
+        self.interval = interval
+        self.dirty = False
+        self._task: asyncio.Task | None = None
+
+    def index_documents(self, kind: str, docs: list[dict]):
+        for doc in docs:
+            if doc and doc.get("id"):
+                self.index.add(_key(kind, doc["id"]), _fields(kind, doc), _meta(kind, doc))
+                self.dirty = True
+
+    def remove(self, kind: str, id: str):
+        self.index.remove(_key(kind, id))
+        self.dirty = True
+
+    def search(self, q: str, kind: str | None = None, limit: int = 20, prefix: bool = True) -> list[dict]:
+        filter_fn = (lambda meta: meta["kind"] == kind) if kind else None
+        hits = self.index.search(q, limit=limit, prefix=prefix, filter_fn=filter_fn)
+        return [{**self.index.docs[key]["meta"], "score": round(score, 4)} for key, score in hits]
+
+    # ─── snapshot ───────────────────────────────────────────────────────────
+    def _write_snapshot(self, payload: bytes):
+        # a temp file of its own: every uvicorn worker saves to the same path
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".search-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)  # readers never see a half-written file
+        except OSError:
+            os.unlink(tmp)
+            raise
+
+    async def save(self):
+        if not self.path:
+            return
+        # dump() copies the top level on the loop thread; the per-document term
+        # maps it shares are replaced, never mutated, so encoding can run off-loop
+        data = {"format": SNAPSHOT_FORMAT, "saved_at": datetime.now(timezone.utc).isoformat(), "docs": self.index.dump()}
+        self.dirty = False
+        try:
+            await asyncio.to_thread(lambda: self._write_snapshot(dumps(data)))
+        except OSError:
+            self.dirty = True
+            logger.exception("search snapshot write failed: %s", self.path)
+
+    def _read_snapshot(self) -> dict | None:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                data = loads(f.read())
+        except (OSError, ValueError):
+            logger.exception("search snapshot unreadable, rebuilding: %s", self.path)
+            return None
+        return data if data.get("format") == SNAPSHOT_FORMAT else None
+
+    async def load(self, sources: dict):
+        # sources: kind -> collection
+        data = await asyncio.to_thread(self._read_snapshot)
+        if data is None:
+            await self.rebuild(sources)
+            return
+        self.index.load(data["docs"])
+        await self._catch_up(sources, data["saved_at"])
+
+    async def rebuild(self, sources: dict):
+        self.index.load({})
+        for kind, source in sources.items():
+            async for doc in source.find({}, SEARCH_SOURCE_FIELDS):
+                self.index_documents(kind, [doc])
+        self.dirty = True
+        await self.save()
+
+    async def _catch_up(self, sources: dict, saved_at: str):
+        # reindex documents created (ObjectId time) or updated (last_updated) since
+        # the snapshot, and drop the ones deleted meanwhile. The margin covers clock
+        # skew between workers; reindexing a few unchanged documents is harmless.
+        since = datetime.fromisoformat(saved_at) - timedelta(seconds=SNAPSHOT_CATCH_UP_MARGIN)
+        saved_at = since.isoformat()
+        changed = {"$or": [{"_id": {"$gte": ObjectId.from_datetime(since)}}, {"last_updated": {"$gte": saved_at}}]}
+        for kind, source in sources.items():
+            async for doc in source.find(changed, SEARCH_SOURCE_FIELDS):
+                self.index_documents(kind, [doc])
+            live = {doc["id"] async for doc in source.find({}, {"_id": 0, "id": 1})}
+            for key, d in list(self.index.docs.items()):
+                if d["meta"]["kind"] == kind and d["meta"]["id"] not in live:
+                    self.remove(kind, d["meta"]["id"])
+        if self.dirty:
+            await self.save()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.dirty:
+                await self.save()
+
+    def start(self):
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.dirty:
+            await self.save()
+
+service = SearchService(index, SEARCH_SNAPSHOT_PATH, SEARCH_SNAPSHOT_INTERVAL)
+
+def _sources() -> dict:
+    # imported here: the content controllers import derived, which imports this module
+    from app.controllers import itineraries, travelogues
+    return {"itinerary": itineraries.collection, "travelogue": travelogues.collection}
+
+@traced
+async def load_search_index():
+    await service.load(_sources())
+    service.start()
+
+@traced
+async def rebuild_search_index() -> int:
+    await service.rebuild(_sources())
+    return len(index)
@@ -1,42 +1,188 @@
 # controllers/travelogues.py
-from fastapi.encoders import jsonable_encoder
 from app.config import db
+from app.models.migrations import SCHEMA_VERSIONS
 from app.models.travoulage import Travelogue
-from pymongo import ReturnDocument
+from app.controllers.assets import expand_images, store_images
+from app.controllers.derived import after_delete, after_write
+from app.controllers.migrations import upgrade_on_read, upgrade_stream
+from app.utils.database import public_reads
+from app.utils.cache import DocumentCache, read_through, read_through_many
+from app.utils.export import export_cursor, stream_documents
+from app.utils.pagination import faceted_page, paginate, parse_fields
+from app.utils.ids import IdAllocator
+from app.utils.patch import build_patch_update, check_guards, compact_arrays, patch_projection
+from app.utils.serialization import strip_none, to_document
+from app.utils.slugs import SLUG_INDEX, prepare_slug_index, slugify, write_with_unique_slug
+from app.utils.versioning import parse_body_version, versioned_update
+from pymongo import ASCENDING, IndexModel
+from app.utils.instrumentation import traced
 
 collection = db["travelogues"]
+# public list/filter/export reads; single-document reads fill doc_cache right
+# after writes invalidate it, so they stay on the primary
+reads = public_reads(collection)
+
+# public sort name -> field; every entry is backed by a (field, _id) index below
+LIST_SORTS = {"created": "_id", "title": "title", "published": "published_at"}
+
+# facet name -> document path counted by filter_travelogues
+FILTER_FACETS = {
+    "categories": "categories",
+    "season": "filter_keys.season",
+    "region": "filter_keys.region",
+    "travel_type": "filter_keys.travel_type",
+    "tags": "filter_keys.tags",
+}
+
+@traced
+async def ensure_travelogue_indexes():
+    # legacy travelogues predate the unique index: duplicates are renamed first
+    renamed = await prepare_slug_index(collection)
+    if renamed:
+        await after_write("travelogue", renamed)
+    await collection.create_indexes([
+        IndexModel([("id", ASCENDING)], name="id"),
+        SLUG_INDEX,
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title__id"),
+        IndexModel([("published_at", ASCENDING), ("_id", ASCENDING)], name="published_at__id"),
+        # filters: a compound index may hold at most one array (multikey) field
+        IndexModel([("filter_keys.region", ASCENDING), ("filter_keys.travel_type", ASCENDING)], name="region_travel_type"),
+        IndexModel([("filter_keys.season", ASCENDING), ("filter_keys.budget_min", ASCENDING)], name="season_budget_min"),
+        IndexModel([("filter_keys.budget_min", ASCENDING), ("filter_keys.budget_max", ASCENDING)], name="budget_range"),
+        IndexModel([("filter_keys.tags", ASCENDING)], name="tags"),
+        IndexModel([("categories", ASCENDING)], name="categories"),
+        IndexModel([("destinations", ASCENDING)], name="destinations"),
+        IndexModel([("cover_image.asset", ASCENDING)], name="cover_image_asset"),
+    ])
+
+# rendered single-document reads by id and slug; evicted on update/delete
+doc_cache = DocumentCache()
+
+travelogue_ids = IdAllocator("travelogues_seq", "tl-{seq:03d}")
 
 async def _next_travelogue_id() -> str:
-    doc = await db["counters"].find_one_and_update(
-        {"_id": "travelogues_seq"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=ReturnDocument.AFTER,
-    )
-    seq = int(doc.get("seq", 1))
-    return f"tl-{seq:03d}"
+    return await travelogue_ids.next_id()
 
+@traced
 async def create_travelogue(data: Travelogue):
-    payload = jsonable_encoder(data, by_alias=True, exclude_none=True)  # exclude None fields
+    payload = to_document(data)  # exclude None fields
+    [payload] = await store_images([payload])  # embedded images -> asset references
+    payload["schema_version"] = SCHEMA_VERSIONS["travelogue"]
     if not payload.get("id"):
         payload["id"] = await _next_travelogue_id()
-    result = await collection.insert_one(payload)
+    base_slug = slugify(payload.get("slug") or payload.get("title") or "") or payload["id"]
+
+    async def _insert(slug: str):
+        payload["slug"] = slug
+        return await collection.insert_one(payload)
+
+    result = await write_with_unique_slug(collection, base_slug, _insert)
+    await after_write("travelogue", [payload])
     payload["_id"] = str(result.inserted_id)  # set the inserted ID for response
     return payload
 
-async def get_all_travelogues():
-    items = []
-    async for doc in collection.find():
-        doc["_id"] = str(doc["_id"])  # keep Mongo id as string in responses
-        items.append(doc)
-    return items
+@traced
+async def get_all_travelogues(limit: int, cursor: str | None = None, sort: str | None = None, fields: str | None = None, expand: set[str] = frozenset()):
+    page = await paginate(
+        reads,
+        {},
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+        fields=fields,
+    )
+    if not fields:
+        upgrade_on_read("travelogue", collection, page["items"])
+    if "images" in expand:
+        page["items"] = await expand_images(page["items"])
+    return page
 
-async def get_travelogue(id: str):
-    doc = await collection.find_one({"id": id})
-    if doc:
-        doc["_id"] = str(doc["_id"])  # normalize for response
+def build_travelogue_filter(
+    categories: list[str] | None = None,
+    destinations: list[str] | None = None,
+    season: list[str] | None = None,
+    region: list[str] | None = None,
+    travel_type: list[str] | None = None,
+    tags: list[str] | None = None,
+    budget_min: int | None = None,
+    budget_max: int | None = None,
+) -> dict:
+    # any-of within one facet, all-of across facets
+    query = {}
+    for path, values in (
+        ("categories", categories),
+        ("destinations", destinations),
+        ("filter_keys.season", season),
+        ("filter_keys.region", region),
+        ("filter_keys.travel_type", travel_type),
+        ("filter_keys.tags", tags),
+    ):
+        if values:
+            query[path] = {"$in": values}
+    # budget: the travelogue's [budget_min, budget_max] range overlaps the requested one
+    if budget_max is not None:
+        query["filter_keys.budget_min"] = {"$lte": budget_max}
+    if budget_min is not None:
+        query["filter_keys.budget_max"] = {"$gte": budget_min}
+    return query
+
+@traced
+async def filter_travelogues(query: dict, limit: int, cursor: str | None = None, sort: str | None = None, fields: str | None = None, expand: set[str] = frozenset()):
+    page = await faceted_page(
+        reads,
+        query,
+        facets=FILTER_FACETS,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        sorts=LIST_SORTS,
+        default_sort="created",
+        fields=fields,
+    )
+    if not fields:
+        upgrade_on_read("travelogue", collection, page["items"])
+    if "images" in expand:
+        page["items"] = await expand_images(page["items"])
+    return page
+
+def export_travelogues(fmt: str = "ndjson", fields: str | None = None):
+    cursor = export_cursor(reads, parse_fields(fields, always=("id",)))
+    if not fields:
+        cursor = upgrade_stream("travelogue", cursor)
+    return stream_documents(cursor, fmt)
+
+async def _load(query: dict, expand: set[str]):
+    doc = await collection.find_one(query)
+    upgrade_on_read("travelogue", collection, [doc])
+    if doc and "images" in expand:
+        [doc] = await expand_images([doc])
     return doc
 
+@traced
+async def get_travelogue_entry(id: str, expand: set[str] = frozenset()):
+    key = ("id+images" if "images" in expand else "id", id)
+    return await read_through(doc_cache, key, lambda: _load({"id": id}, expand))
+
+async def _load_many(ids: list[str], expand: set[str]) -> list[dict]:
+    docs = await collection.find({"id": {"$in": ids}}).to_list(length=None)
+    upgrade_on_read("travelogue", collection, docs)
+    if "images" in expand:
+        docs = await expand_images(docs)
+    return docs
+
+@traced
+async def get_travelogue_entries(ids: list[str], expand: set[str] = frozenset()):
+    # batch get: cached documents plus one $in for the rest, in the order of ids
+    kind = "id+images" if "images" in expand else "id"
+    return await read_through_many(doc_cache, kind, ids, lambda missing: _load_many(missing, expand))
+
+@traced
+async def get_travelogue_entry_by_slug(slug: str, expand: set[str] = frozenset()):
+    key = ("slug+images" if "images" in expand else "slug", slug)
+    return await read_through(doc_cache, key, lambda: _load({"slug": slug}, expand))
+
 async def update_travelogogue_filter(id: str):
     return {"id": id}
 
@@ -45,12 +191,65 @@ async def update_travelogogue_return(doc):
         doc["_id"] = str(doc["_id"])  # normalize for response
     return doc
 
-async def update_travelogue(id: str, data: dict):
-    update_doc = {"$set": jsonable_encoder(data, by_alias=True, exclude_none=True)}  # exclude None fields
-    await collection.update_one(await update_travelogogue_filter(id), update_doc)
-    doc = await collection.find_one(await update_travelogogue_filter(id))
+@traced
+async def update_travelogue(id: str, data: dict, expected_version: int | None = None):
+    set_doc = strip_none(data)  # exclude None fields
+    if expected_version is None:
+        expected_version = parse_body_version(set_doc.get("version"))
+    [set_doc] = await store_images([set_doc])
+
+    async def _update(slug: str | None):
+        if slug:
+            set_doc["slug"] = slug
+        return await versioned_update(collection, await update_travelogogue_filter(id), {"$set": set_doc}, expected_version)
+
+    base_slug = slugify(set_doc["slug"]) if set_doc.get("slug") else None
+    if base_slug:
+        doc = await write_with_unique_slug(collection, base_slug, _update, exclude_id=id)
+    else:
+        doc = await _update(None)
+    doc_cache.invalidate(id)
+    if doc:
+        await after_write("travelogue", [doc])
+    return await update_travelogogue_return(doc)
+
+@traced
+async def patch_travelogue(id: str, ops: list[dict], expected_version: int | None = None):
+    # JSON Patch ops -> targeted $set/$push/$unset on just the touched paths
+    query = await update_travelogogue_filter(id)
+    # paths into content blocks are validated against each stored block's type
+    projection = patch_projection(Travelogue, ops)
+    stored = None
+    if projection:
+        stored = await collection.find_one(query, projection)
+        if stored is None:
+            return None
+    update, compact, guards = build_patch_update(Travelogue, ops, stored)
+    [update] = await store_images([update])
+    set_doc = update.setdefault("$set", {})
+    base_slug = slugify(set_doc["slug"]) if set_doc.get("slug") else None
+
+    async def _update(slug: str | None):
+        if slug:
+            set_doc["slug"] = slug
+        return await versioned_update(collection, {**query, **guards}, update, expected_version)
+
+    if base_slug:
+        doc = await write_with_unique_slug(collection, base_slug, _update, exclude_id=id)
+    else:
+        doc = await _update(None)
+    if doc is None:
+        await check_guards(collection, query, guards)
+    if doc and compact:
+        doc = await compact_arrays(collection, query, compact, doc["version"])
+    doc_cache.invalidate(id)
+    if doc:
+        await after_write("travelogue", [doc])
     return await update_travelogogue_return(doc)
 
+@traced
 async def delete_travelogue(id: str):
     result = await collection.delete_one({"id": id})
+    doc_cache.invalidate(id)
+    await after_delete("travelogue", id)
     return {"deleted": result.deleted_count == 1}
\ No newline at end of file
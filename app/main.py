@@ -1,9 +1,66 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.controllers.cards import ensure_card_indexes, reads as card_reads
+from app.controllers.feed import service as feed_service
+from app.controllers.imports import shutdown_import_pool
+from app.controllers.invalidation import bus as invalidation_bus
+from app.controllers.itineraries import ensure_itinerary_indexes, reads as itinerary_reads
+from app.config import MIGRATION_ON_STARTUP
+from app.controllers.migrations import migrator as schema_migrator
+from app.controllers.metrics import buffer as metrics_buffer, ensure_metrics_indexes
+from app.controllers.published import ensure_published_backfill, ensure_published_indexes
+from app.controllers.related import load_related, updater as related_updater
+from app.controllers.search import load_search_index, service as search_service
+from app.controllers.travelogues import ensure_travelogue_indexes, reads as travelogue_reads
+from app.utils.database import bootstrap_indexes, close as close_database, connect, warm_up
+from app.utils.instrumentation import TimingMiddleware
+from app.utils.serialization import MongoJSONResponse
 from app.routes.travelogues import router as travelogues_router
 from app.routes.itineraries import router as itineraries_router
+from app.routes.metrics import router as metrics_router
+from app.routes.cards import router as cards_router
+from app.routes.search import router as search_router
+from app.routes.related import router as related_router
+from app.routes.assets import router as assets_router
+from app.routes.monitoring import router as monitoring_router
+from app.routes.feed import router as feed_router
 
-app = FastAPI(title="Itinerary CMS")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect()  # fail the deploy on an unreachable cluster, not the first request
+    # indexes backing list sorts / lookups; create_index is a no-op when they exist
+    await bootstrap_indexes(
+        ensure_itinerary_indexes,
+        ensure_travelogue_indexes,
+        ensure_metrics_indexes,
+        ensure_card_indexes,
+        ensure_published_indexes,
+    )
+    await warm_up(itinerary_reads, travelogue_reads, card_reads)  # pooled connections, hot pages
+    invalidation_bus.mark()  # writes by other workers during the loads below are replayed
+    await load_related()  # feature index in memory; stored lists reused
+    related_updater.start()  # recomputes after writes, off the request path
+    await load_search_index()  # snapshot + catch-up, full scan only without one
+    await ensure_published_backfill()  # existing live content, on the first start only
+    await feed_service.start()  # first ranking and pages before the first request
+    await invalidation_bus.start()  # other workers' writes evict/refresh ours
+    metrics_buffer.start()
+    if MIGRATION_ON_STARTUP:
+        schema_migrator.start()  # throttled; one worker per kind holds the lease
+    yield
+    await invalidation_bus.stop()
+    await related_updater.stop()  # queued recomputes are written first
+    await metrics_buffer.stop()  # final flush so buffered engagement is not lost
+    await search_service.stop()  # final snapshot
+    await feed_service.stop()
+    await schema_migrator.stop()  # checkpointed; another worker resumes from last_id
+    shutdown_import_pool()
+    close_database()  # last: everything above may still write
+
+
+app = FastAPI(title="Itinerary CMS", lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 # CORS for local frontend dev
 origins = [
@@ -17,6 +74,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# per-route latency histograms and Mongo time per request, exposed at /metrics
+app.add_middleware(TimingMiddleware)
 
 app.include_router(travelogues_router)
-app.include_router(itineraries_router)
\ No newline at end of file
+app.include_router(itineraries_router)
+app.include_router(metrics_router)
+app.include_router(cards_router)
+app.include_router(search_router)
+app.include_router(related_router)
+app.include_router(assets_router)
+app.include_router(monitoring_router)
+app.include_router(feed_router)
\ No newline at end of file
@@ -124,6 +124,11 @@ class Filters(BaseModel):
 
 
 # ─── Route Map (unchanged) ───────────────────────────────────────────────────
+class GeoPoint(BaseModel):
+    type: Literal["Point"] = "Point"
+    coordinates: List[float]  # [lng, lat]
+
+
 class RouteStop(BaseModel):
     order: int
     name: str
@@ -135,18 +140,20 @@ class RouteStop(BaseModel):
     image_url: Optional[HttpUrl] = None
     duration_minutes: Optional[int] = None
     tags: Optional[List[str]] = None
+    location: Optional[GeoPoint] = None  # derived from lat/lng on write (2dsphere)
 
 
 class RouteDay(BaseModel):
     day: int
     title: str
     stops: List[RouteStop] = []
+    distance_km: Optional[float] = None  # derived: stop-to-stop great-circle distance
 
 
 class RouteMap(BaseModel):
     interactive: Optional[bool] = None
-    total_stops: Optional[int] = None
-    map_center: Optional[Dict[str, float]] = None  # { lat, lng, zoom }
+    total_stops: Optional[int] = None  # derived on write
+    map_center: Optional[Dict[str, float]] = None  # { lat, lng, zoom }, derived on write
     days: List[RouteDay] = []
 
 
@@ -200,6 +207,7 @@ class GettingAround(BaseModel):
 class Itinerary(BaseModel):
     id: Optional[str] = None  # e.g., itinerary_001
     version: Optional[int] = 1
+    schema_version: Optional[int] = None  # server-maintained, see models/migrations.py
     status: Optional[Literal["draft", "in_review", "published", "archived"]] = "draft"
 
     title: str
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+
+# ─── Engagement events (ingested, aggregated into *Metrics rows) ─────────────
+ContentType = Literal["itinerary", "travelogue"]
+EventType = Literal["view", "like", "dislike", "share", "save", "feedback_inspiring", "feedback_not_useful"]
+
+
+class EngagementEvent(BaseModel):
+    content_type: ContentType
+    content_id: str
+    event: EventType
+    count: int = Field(1, ge=1, le=1000)
+    read_time_seconds: Optional[int] = Field(None, ge=0, le=24 * 3600)  # views only
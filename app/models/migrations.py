@@ -0,0 +1,95 @@
+# models/migrations.py
+# Schema migrations for stored documents. MIGRATIONS[kind][n] upgrades a document
+# from schema_version n + 1 to n + 2, in place; documents without the field are
+# version 1. Steps must be idempotent and tolerate partly-new documents (a PUT
+# can write new-shape fields into an old document), and should only change
+# representation: cards, search and related are not rebuilt for migrated docs.
+# Append new steps at the end; never edit or reorder released ones.
+
+
+def _as_list(value) -> list[str]:
+    if isinstance(value, str):
+        return [t.strip() for t in value.split(",") if t.strip()]
+    if isinstance(value, list):
+        return [t for t in value if isinstance(t, str) and t]
+    return []
+
+
+def _activity_tags(doc: dict):
+    # CHANGED: a single tag / comma string under several names -> activitytags list
+    days = doc.get("daywise_plan")
+    for day in days if isinstance(days, list) else []:
+        activities = day.get("activities") if isinstance(day, dict) else None
+        for activity in activities if isinstance(activities, list) else []:
+            if not isinstance(activity, dict):
+                continue
+            tags = _as_list(activity.get("activitytags"))
+            for legacy in ("activity_tags", "activitytag", "activity_tag", "tags", "tag"):
+                if legacy in activity:
+                    tags += _as_list(activity.pop(legacy))
+            if tags:
+                activity["activitytags"] = list(dict.fromkeys(tags))
+
+
+NOTE_TYPES = {"info": "info", "note": "info", "warning": "warning", "alert": "warning", "caution": "warning",
+              "danger": "warning", "tip": "tip", "hint": "tip"}
+
+
+def _typed_travel_notes(doc: dict):
+    # travel notes were plain strings, then free-form types; now info | warning | tip
+    notes = doc.get("travel_notes")
+    if not isinstance(notes, list):
+        return
+    out = []
+    for note in notes:
+        if isinstance(note, str):
+            note = {"text": note}
+        if isinstance(note, dict):
+            note["type"] = NOTE_TYPES.get(str(note.get("type", "info")).lower(), "info")
+        out.append(note)
+    doc["travel_notes"] = out
+
+
+TRAVEL_ICONS = {"flight": "plane", "airplane": "plane", "rail": "train", "coach": "bus", "taxi": "car",
+                "cab": "car", "cycle": "bicycle", "bike": "bicycle", "boat": "ship", "ferry": "ship",
+                "cruise": "ship"}
+
+
+def _travel_modes(doc: dict):
+    # EXTENDED icon keys: legacy aliases -> plane/train/bus/car/bicycle/ship;
+    # how_to_reach stored as a bare list -> {"modes": [...]}
+    if isinstance(doc.get("how_to_reach"), list):
+        doc["how_to_reach"] = {"modes": doc["how_to_reach"]}
+    options = []
+    for section, key in (("how_to_reach", "modes"), ("getting_around", "options")):
+        value = doc.get(section)
+        if isinstance(value, dict) and isinstance(value.get(key), list):
+            options += value[key]
+    for option in options:
+        if isinstance(option, dict) and isinstance(option.get("icon"), str):
+            icon = option["icon"].lower()
+            option["icon"] = TRAVEL_ICONS.get(icon, icon)
+
+
+MIGRATIONS = {
+    "itinerary": [_activity_tags, _typed_travel_notes, _travel_modes],
+    "travelogue": [],
+}
+SCHEMA_VERSIONS = {kind: len(steps) + 1 for kind, steps in MIGRATIONS.items()}
+
+
+def upgrade(kind: str, doc: dict) -> bool:
+    # in place; -> True if the document was behind (and is now current)
+    version = doc.get("schema_version", 1)
+    target = SCHEMA_VERSIONS[kind]
+    if version >= target:
+        return False
+    for step in MIGRATIONS[kind][version - 1:]:
+        step(doc)
+    doc["schema_version"] = target
+    return True
+
+
+def outdated_query(kind: str) -> dict:
+    target = SCHEMA_VERSIONS[kind]
+    return {"$or": [{"schema_version": {"$lt": target}}, {"schema_version": {"$exists": False}}]}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Literal, Union
+from typing import Annotated, List, Optional, Literal, Union
 from uuid import UUID
 
 # -------------------- ENUMS --------------------
@@ -163,7 +163,9 @@ class RelatedTraveloguesBlock(BaseModel):
 
 # -------------------- MAIN UNION BLOCK --------------------
 
-ContentBlock = Union[
+# Tagged on `type`: each block is validated against exactly one member and
+# errors name it (content_blocks.3.text.content) instead of listing all 14.
+ContentBlock = Annotated[Union[
     TextBlock,
     ImageBlock,
     QuoteBlock,
@@ -178,7 +180,7 @@ ContentBlock = Union[
     ClosingQuoteBlock,
     RelatedItinerariesBlock,
     RelatedTraveloguesBlock
-]
+], Field(discriminator="type")]
 
 # -------------------- MAIN TRAVELOGUE MODEL --------------------
 
@@ -196,6 +198,8 @@ class TravelogueFilters(BaseModel):
 
 class Travelogue(BaseModel):
     id: Optional[str] = None
+    version: Optional[int] = 1
+    schema_version: Optional[int] = None  # server-maintained, see models/migrations.py
     slug: str
     title: str
     subtitle: Optional[str] = None
@@ -206,11 +210,13 @@ class Travelogue(BaseModel):
     cover_image: ImageAsset
     content_blocks: List[ContentBlock]
     filter_keys: Optional[TravelogueFilters] = None
+    last_updated: Optional[str] = None
 
 # -------------------- METRICS MODEL --------------------
 
 class TravelogueMetrics(BaseModel):
     id: UUID
+    content_id: Optional[str] = None  # travelogue id, e.g. tl-001
     date_key: str  # e.g. "TOTAL" or specific date
     views: int
     likes: int
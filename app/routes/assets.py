@@ -0,0 +1,16 @@
+# routes/assets.py
+from fastapi import APIRouter
+from app.controllers.assets import get_asset, update_asset
+from app.utils.serialization import MongoJSONResponse
+
+# Image asset registry: documents hold {"asset": id, "image_url": ...} references
+router = APIRouter(prefix="/assets", tags=["Assets"])
+
+@router.get("/{id}")
+async def get_one(id: str):
+    return MongoJSONResponse(await get_asset(id))
+
+@router.patch("/{id}")
+async def update(id: str, data: dict):
+    # metadata edit (alt_text, blurhash, cdn_variant, ...): one record, seen by every document using it
+    return MongoJSONResponse(await update_asset(id, data))
@@ -0,0 +1,42 @@
+# routes/cards.py
+from fastapi import APIRouter, Query
+from app.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.controllers.cards import list_cards
+from app.utils.serialization import MongoJSONResponse
+
+# Discovery/listing pages: compact cards instead of whole documents
+router = APIRouter(prefix="/cards", tags=["Cards"])
+
+async def _list(kind, limit, cursor, sort, category, destination):
+    return MongoJSONResponse(await list_cards(kind, limit, cursor, sort, category, destination))
+
+@router.get("")
+@router.get("/")
+async def get_all(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    category: list[str] | None = Query(None),
+    destination: list[str] | None = Query(None),
+):
+    return await _list(None, limit, cursor, sort, category, destination)
+
+@router.get("/itineraries")
+async def get_itineraries(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    category: list[str] | None = Query(None),
+    destination: list[str] | None = Query(None),
+):
+    return await _list("itinerary", limit, cursor, sort, category, destination)
+
+@router.get("/travelogues")
+async def get_travelogues(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    category: list[str] | None = Query(None),
+    destination: list[str] | None = Query(None),
+):
+    return await _list("travelogue", limit, cursor, sort, category, destination)
@@ -0,0 +1,22 @@
+# routes/feed.py
+from typing import Literal
+from fastapi import APIRouter, Query, Request
+from app.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.controllers.feed import get_feed
+from app.utils.cache import conditional_response
+
+# Home feed: published itineraries and travelogues in one ranked list
+router = APIRouter(prefix="/feed", tags=["Feed"])
+
+@router.get("")
+@router.get("/")
+async def feed(
+    request: Request,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    kind: Literal["itinerary", "travelogue"] | None = None,
+    destination: list[str] | None = Query(None),
+    category: list[str] | None = Query(None),
+):
+    # served from memory; ETag changes whenever the page content does
+    return conditional_response(await get_feed(limit, cursor, kind, destination, category), request)
@@ -1,12 +1,30 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from app.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.controllers.imports import import_ndjson
+from app.utils.assets import parse_expand
+from app.utils.cache import batch_response, conditional_response
+from app.utils.export import MEDIA_TYPES
+from app.utils.pagination import parse_ids
+from app.utils.serialization import MongoJSONResponse
+from app.utils.versioning import parse_if_match
 from app.models.itineraries import Itinerary
 from app.controllers.itineraries import (
     create_itinerary,
     get_all_itineraries,
-    get_itinerary,
+    build_itinerary_filter,
+    filter_itineraries,
+    nearby_itineraries,
+    itineraries_within,
+    export_itineraries,
+    get_itinerary_entry,
+    get_itinerary_entries,
+    get_itinerary_entry_by_slug,
     update_itinerary,
+    patch_itinerary,
     delete_itinerary,
 )
+from app.controllers.published import get_published, publish, unpublish
 
 # Use a distinct prefix to avoid clashing with existing /itineraries routes
 router = APIRouter(prefix="/itineraries", tags=["Itineraries v2"])
@@ -14,20 +32,117 @@ router = APIRouter(prefix="/itineraries", tags=["Itineraries v2"])
 @router.post("")
 @router.post("/")
 async def create(data: Itinerary):
-    return await create_itinerary(data)
+    return MongoJSONResponse(await create_itinerary(data))
+
+@router.post("/import")
+async def bulk_import(request: Request):
+    # body: NDJSON, one Itinerary per line; streamed, never buffered whole
+    return MongoJSONResponse(await import_ndjson("itineraries", request.stream()))
 
 @router.get("")
 @router.get("/")
-async def get_all():
-    return await get_all_itineraries()
+async def get_all(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    fields: str | None = None,
+    expand: str | None = None,
+):
+    return MongoJSONResponse(await get_all_itineraries(limit, cursor, sort, fields, parse_expand(expand)))
+
+@router.get("/export")
+async def export(fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"), fields: str | None = None):
+    return StreamingResponse(export_itineraries(fmt, fields), media_type=MEDIA_TYPES[fmt])
+
+@router.get("/filter")
+async def filter_all(
+    category: list[str] | None = Query(None),
+    destination: list[str] | None = Query(None),
+    budget_tier: list[str] | None = Query(None),
+    season: list[str] | None = Query(None),
+    perfect_for: list[str] | None = Query(None),
+    filter_key: list[str] | None = Query(None),
+    duration_min: int | None = Query(None, ge=0),
+    duration_max: int | None = Query(None, ge=0),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    fields: str | None = None,
+    expand: str | None = None,
+):
+    query = build_itinerary_filter(
+        categories=category,
+        destinations=destination,
+        budget_tier=budget_tier,
+        best_season=season,
+        perfect_for=perfect_for,
+        filter_keys=filter_key,
+        duration_min=duration_min,
+        duration_max=duration_max,
+    )
+    return MongoJSONResponse(await filter_itineraries(query, limit, cursor, sort, fields, parse_expand(expand)))
+
+@router.get("/nearby")
+async def nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25, gt=0, le=1000),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+):
+    # itineraries with a route stop within radius_km, nearest first
+    return MongoJSONResponse(await nearby_itineraries(lat, lng, radius_km, limit))
+
+@router.get("/within")
+async def within(
+    bbox: str = Query(..., description="minLng,minLat,maxLng,maxLat"),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    fields: str | None = None,
+):
+    # itineraries with a route stop inside the box
+    return MongoJSONResponse(await itineraries_within(bbox, limit, cursor, sort, fields))
+
+@router.get("/batch")
+async def get_many(ids: list[str] = Query(...), expand: str | None = None):
+    # one $in for every id not already cached; items follow the order of ids, null where missing
+    entries = await get_itinerary_entries(parse_ids(ids, PAGE_SIZE_MAX), parse_expand(expand))
+    return batch_response(entries)
+
+@router.get("/slug/{slug}")
+async def get_by_slug(slug: str, request: Request, expand: str | None = None):
+    entry = await get_itinerary_entry_by_slug(slug, parse_expand(expand))
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
+
+@router.get("/published/{slug}")
+async def get_published_one(slug: str, request: Request):
+    # public read: the snapshot written by the last publish, images expanded
+    entry = await get_published("itinerary", slug)
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
 
 @router.get("/{id}")
-async def get_one(id: str):
-    return await get_itinerary(id)
+async def get_one(id: str, request: Request, expand: str | None = None):
+    entry = await get_itinerary_entry(id, parse_expand(expand))
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
 
 @router.put("/{id}")
-async def update(id: str, data: dict):
-    return await update_itinerary(id, data)
+async def update(id: str, data: dict, if_match: str | None = Header(None)):
+    # expected version: If-Match header, else the "version" sent in the body
+    return MongoJSONResponse(await update_itinerary(id, data, parse_if_match(if_match)))
+
+@router.patch("/{id}")
+async def patch(id: str, ops: list[dict] = Body(...), if_match: str | None = Header(None)):
+    # body: JSON Patch, e.g. [{"op": "replace", "path": "/daywise_plan/3/activities/2/title", "value": "..."}]
+    return MongoJSONResponse(await patch_itinerary(id, ops, parse_if_match(if_match)))
+
+@router.post("/{id}/publish")
+async def publish_one(id: str, if_match: str | None = Header(None)):
+    # validates the current version and replaces the live snapshot; If-Match pins the version reviewed
+    return MongoJSONResponse(await publish("itinerary", id, parse_if_match(if_match)))
+
+@router.post("/{id}/unpublish")
+async def unpublish_one(id: str):
+    return MongoJSONResponse(await unpublish("itinerary", id))
 
 @router.delete("/{id}")
 async def delete(id: str):
@@ -0,0 +1,24 @@
+# routes/metrics.py
+from fastapi import APIRouter, Path
+from app.models.metrics import EngagementEvent
+from app.controllers.metrics import (
+    TOTAL,
+    record_events,
+    get_metrics,
+)
+from app.utils.serialization import MongoJSONResponse
+
+router = APIRouter(prefix="/engagement", tags=["Engagement"])
+
+@router.post("/events", status_code=202)
+async def ingest(events: list[EngagementEvent]):
+    # buffered in memory, flushed to Mongo in periodic unordered bulk writes
+    return MongoJSONResponse(await record_events(events), status_code=202)
+
+@router.get("/{content_type}/{content_id}")
+async def get_one(
+    content_id: str,
+    content_type: str = Path(..., pattern="^(itinerary|travelogue)$"),
+    date_key: str = TOTAL,
+):
+    return MongoJSONResponse(await get_metrics(content_type, content_id, date_key))
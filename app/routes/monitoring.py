@@ -0,0 +1,11 @@
+# routes/monitoring.py
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.utils.instrumentation import registry
+
+router = APIRouter(tags=["Monitoring"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus text exposition: request latency per route, Mongo command latency
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,16 @@
+# routes/related.py
+from fastapi import APIRouter, Path, Query
+from app.config import RELATED_TOP_K
+from app.controllers.related import get_related
+from app.utils.serialization import MongoJSONResponse
+
+# Precomputed related itineraries/travelogues (no similarity work per request)
+router = APIRouter(prefix="/related", tags=["Related"])
+
+@router.get("/{kind}/{id}")
+async def get_one(
+    id: str,
+    kind: str = Path(..., pattern="^(itinerary|travelogue)$"),
+    limit: int = Query(RELATED_TOP_K, ge=1, le=RELATED_TOP_K),
+):
+    return MongoJSONResponse(await get_related(kind, id, limit))
@@ -0,0 +1,18 @@
+# routes/search.py
+from typing import Literal
+from fastapi import APIRouter, Query
+from app.controllers.search import service
+from app.utils.serialization import MongoJSONResponse
+
+# Full-text search over itineraries and travelogues (in-memory index)
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("")
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Literal["itinerary", "travelogue"] | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = True,
+):
+    return MongoJSONResponse({"items": service.search(q, kind, limit, prefix)})
@@ -1,31 +1,123 @@
 # routes/travelogues.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from app.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from app.controllers.imports import import_ndjson
+from app.utils.assets import parse_expand
+from app.utils.cache import batch_response, conditional_response
+from app.utils.export import MEDIA_TYPES
+from app.utils.pagination import parse_ids
+from app.utils.serialization import MongoJSONResponse
+from app.utils.versioning import parse_if_match
 from app.models.travoulage import Travelogue
 from app.controllers.travelogues import (
     create_travelogue,
     get_all_travelogues,
-    get_travelogue,
+    build_travelogue_filter,
+    filter_travelogues,
+    export_travelogues,
+    get_travelogue_entry,
+    get_travelogue_entries,
+    get_travelogue_entry_by_slug,
     update_travelogue,
+    patch_travelogue,
     delete_travelogue,
 )
+from app.controllers.published import get_published, publish, unpublish
 
 router = APIRouter(prefix="/travoulage", tags=["Travoulage"]) 
 
 @router.post("/")
 async def create(data: Travelogue):
-    return await create_travelogue(data)  # call the function directly
+    return MongoJSONResponse(await create_travelogue(data))  # call the function directly
+
+@router.post("/import")
+async def bulk_import(request: Request):
+    # body: NDJSON, one Travelogue per line; streamed, never buffered whole
+    return MongoJSONResponse(await import_ndjson("travelogues", request.stream()))  # call the function directly
 
 @router.get("/")
-async def get_all():
-    return await get_all_travelogues()  # call the function directly
+async def get_all(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    fields: str | None = None,
+    expand: str | None = None,
+):
+    return MongoJSONResponse(await get_all_travelogues(limit, cursor, sort, fields, parse_expand(expand)))  # call the function directly
+
+@router.get("/export")
+async def export(fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"), fields: str | None = None):
+    return StreamingResponse(export_travelogues(fmt, fields), media_type=MEDIA_TYPES[fmt])  # call the function directly
+
+@router.get("/filter")
+async def filter_all(
+    category: list[str] | None = Query(None),
+    destination: list[str] | None = Query(None),
+    season: list[str] | None = Query(None),
+    region: list[str] | None = Query(None),
+    travel_type: list[str] | None = Query(None),
+    tag: list[str] | None = Query(None),
+    budget_min: int | None = Query(None, ge=0),
+    budget_max: int | None = Query(None, ge=0),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(None, alias="next"),
+    sort: str | None = None,
+    fields: str | None = None,
+    expand: str | None = None,
+):
+    query = build_travelogue_filter(
+        categories=category,
+        destinations=destination,
+        season=season,
+        region=region,
+        travel_type=travel_type,
+        tags=tag,
+        budget_min=budget_min,
+        budget_max=budget_max,
+    )
+    return MongoJSONResponse(await filter_travelogues(query, limit, cursor, sort, fields, parse_expand(expand)))  # call the function directly
+
+@router.get("/batch")
+async def get_many(ids: list[str] = Query(...), expand: str | None = None):
+    # one $in for every id not already cached; items follow the order of ids, null where missing
+    entries = await get_travelogue_entries(parse_ids(ids, PAGE_SIZE_MAX), parse_expand(expand))  # call the function directly
+    return batch_response(entries)
+
+@router.get("/slug/{slug}")
+async def get_by_slug(slug: str, request: Request, expand: str | None = None):
+    entry = await get_travelogue_entry_by_slug(slug, parse_expand(expand))  # call the function directly
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
+
+@router.get("/published/{slug}")
+async def get_published_one(slug: str, request: Request):
+    # public read: the snapshot written by the last publish, images expanded
+    entry = await get_published("travelogue", slug)  # call the function directly
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
 
 @router.get("/{id}")
-async def get_one(id: str):
-    return await get_travelogue(id)  # call the function directly
+async def get_one(id: str, request: Request, expand: str | None = None):
+    entry = await get_travelogue_entry(id, parse_expand(expand))  # call the function directly
+    return conditional_response(entry, request) if entry else MongoJSONResponse(None)
 
 @router.put("/{id}")
-async def update(id: str, data: dict):
-    return await update_travelogue(id, data)  # call the function directly
+async def update(id: str, data: dict, if_match: str | None = Header(None)):
+    # expected version: If-Match header, else the "version" sent in the body
+    return MongoJSONResponse(await update_travelogue(id, data, parse_if_match(if_match)))  # call the function directly
+
+@router.patch("/{id}")
+async def patch(id: str, ops: list[dict] = Body(...), if_match: str | None = Header(None)):
+    # body: JSON Patch, e.g. [{"op": "replace", "path": "/content_blocks/3/content", "value": "..."}]
+    return MongoJSONResponse(await patch_travelogue(id, ops, parse_if_match(if_match)))  # call the function directly
+
+@router.post("/{id}/publish")
+async def publish_one(id: str, if_match: str | None = Header(None)):
+    # validates the current version and replaces the live snapshot; If-Match pins the version reviewed
+    return MongoJSONResponse(await publish("travelogue", id, parse_if_match(if_match)))  # call the function directly
+
+@router.post("/{id}/unpublish")
+async def unpublish_one(id: str):
+    return MongoJSONResponse(await unpublish("travelogue", id))  # call the function directly
 
 @router.delete("/{id}")
 async def delete(id: str):
@@ -0,0 +1,87 @@
+# utils/assets.py
+# Content-addressed image assets. An embedded image object (ImageAsset, DayImage,
+# TripGalleryItem, a related item's thumbnail ...) is split into its asset part,
+# stored once under a hash of URL + metadata, and a reference left in place:
+#   {"asset": "<hash>", "image_url": "...", <placement fields>}
+# image_url stays on the reference so plain reads still have something to render.
+import hashlib
+import orjson
+from fastapi import HTTPException
+
+# metadata that belongs to the image itself
+ASSET_FIELDS = frozenset({
+    "image_url", "alt_text", "blurhash", "width", "height", "aspect_ratio", "focal_point",
+    "mime_type", "size_bytes", "orientation", "cdn_variant",
+})
+# fields that describe where the image is used; they stay on the reference
+PLACEMENT_FIELDS = frozenset({"id", "sort_order", "caption", "uploaded_at"})
+EXPANSIONS = frozenset({"images"})
+
+
+def parse_expand(expand: str | None) -> set[str]:
+    # ?expand=images -> {"images"}
+    names = {e.strip() for e in (expand or "").split(",") if e.strip()}
+    if names - EXPANSIONS:
+        raise HTTPException(status_code=400, detail=f"unknown expand: {sorted(names - EXPANSIONS)}")
+    return names
+
+
+def asset_id(asset: dict) -> str:
+    return hashlib.blake2b(orjson.dumps(asset, option=orjson.OPT_SORT_KEYS), digest_size=12).hexdigest()
+
+
+def _is_image(value: dict) -> bool:
+    return (
+        isinstance(value.get("image_url"), str)
+        and "asset" not in value
+        and value.keys() <= ASSET_FIELDS | PLACEMENT_FIELDS
+        # a bare {"image_url": ...} is smaller inline than as a reference
+        and len(value.keys() & ASSET_FIELDS) > 1
+    )
+
+
+def extract_assets(value, found: dict):
+    # -> value with image objects replaced by references; found: asset id -> asset
+    if isinstance(value, list):
+        return [extract_assets(v, found) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if _is_image(value):
+        asset = {k: v for k, v in value.items() if k in ASSET_FIELDS}
+        h = asset_id(asset)
+        found[h] = asset
+        ref = {"asset": h, "image_url": asset["image_url"]}
+        ref.update((k, v) for k, v in value.items() if k in PLACEMENT_FIELDS)
+        return ref
+    return {k: extract_assets(v, found) for k, v in value.items()}
+
+
+def collect_refs(value, out: set):
+    if isinstance(value, list):
+        for v in value:
+            collect_refs(v, out)
+    elif isinstance(value, dict):
+        if isinstance(value.get("asset"), str):
+            out.add(value["asset"])
+        else:
+            for v in value.values():
+                collect_refs(v, out)
+    return out
+
+
+def expand_refs(value, assets: dict):
+    # fields set on the reference itself (placement, patched overrides) win;
+    # unknown ids are left as references
+    if isinstance(value, list):
+        return [expand_refs(v, assets) for v in value]
+    if not isinstance(value, dict):
+        return value
+    h = value.get("asset")
+    if isinstance(h, str):
+        asset = assets.get(h)
+        if asset is None:
+            return value
+        expanded = {k: v for k, v in asset.items() if k in ASSET_FIELDS}
+        expanded.update((k, v) for k, v in value.items() if k not in ("asset", "image_url"))
+        return expanded
+    return {k: expand_refs(v, assets) for k, v in value.items()}
@@ -0,0 +1,35 @@
+# utils/bulk_validation.py
+# Runs inside import worker processes: keep imports to the models only.
+import orjson
+from pydantic import ValidationError
+from app.models.itineraries import Itinerary
+from app.models.migrations import upgrade
+from app.models.travoulage import Travelogue
+from app.utils.geo import derive_route_map
+from app.utils.serialization import to_document
+
+MODELS = {"itineraries": Itinerary, "travelogues": Travelogue}
+KINDS = {"itineraries": "itinerary", "travelogues": "travelogue"}
+
+
+def validate_chunk(kind: str, records: list[tuple[int, bytes]]) -> list[tuple[int, dict | None, list | str | None]]:
+    # -> (line, payload, None) for valid records, (line, None, errors) otherwise
+    model = MODELS[kind]
+    out = []
+    for line_no, raw in records:
+        try:
+            record = orjson.loads(raw)
+            if isinstance(record, dict):
+                upgrade(KINDS[kind], record)  # exports from older versions import as-is
+            data = model.model_validate(record)
+        except orjson.JSONDecodeError as e:
+            out.append((line_no, None, f"invalid JSON: {e}"))
+            continue
+        except ValidationError as e:
+            out.append((line_no, None, e.errors(include_url=False, include_input=False, include_context=False)))
+            continue
+        payload = to_document(data)
+        if payload.get("route_map"):
+            derive_route_map(payload["route_map"])
+        out.append((line_no, payload, None))
+    return out
@@ -0,0 +1,141 @@
+# utils/cache.py
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import Request, Response
+from app.config import DOC_CACHE_SIZE, DOC_CACHE_TTL
+from app.utils.serialization import dumps
+
+
+@dataclass(frozen=True)
+class CachedDocument:
+    id: str
+    slug: str | None
+    body: bytes  # serialized once, served as-is
+    etag: str
+    expires_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def make_entry(doc: dict, ttl: float = DOC_CACHE_TTL) -> CachedDocument:
+    body = dumps(doc)
+    return CachedDocument(doc.get("id"), doc.get("slug"), body, make_etag(body), time.monotonic() + ttl)
+
+
+class DocumentCache:
+    # Bounded LRU + TTL over serialized documents, addressable by id and by slug.
+    # `epoch` guards read-through fills: a fill that started before an invalidation
+    # is dropped instead of re-inserting the stale document.
+
+    def __init__(self, maxsize: int = DOC_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.epoch = 0
+        self._entries: OrderedDict[tuple[str, str], CachedDocument] = OrderedDict()
+        self._keys_by_id: dict[str, set[tuple[str, str]]] = {}
+        # (key, epoch) -> the load already running for it (singleflight)
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    def get(self, key: tuple[str, str]) -> CachedDocument | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple[str, str], entry: CachedDocument, epoch: int):
+        if epoch != self.epoch:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._keys_by_id.setdefault(entry.id, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_id.get(entry.id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_id[entry.id]
+
+    def invalidate(self, id: str):
+        # evicts the id entry and every slug entry of the same document
+        self.epoch += 1
+        for key in list(self._keys_by_id.pop(id, ())):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self.epoch += 1
+        self._entries.clear()
+        self._keys_by_id.clear()
+
+
+async def _fill(cache: DocumentCache, key: tuple[str, str], epoch: int, load, build) -> CachedDocument | None:
+    doc = await load()
+    if not doc:
+        return None
+    entry = build(doc)
+    cache.put(key, entry, epoch)
+    return entry
+
+
+async def read_through(cache: DocumentCache, key: tuple[str, str], load, build=make_entry) -> CachedDocument | None:
+    # build: loaded record -> CachedDocument (default: serialize the document)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+    # Concurrent misses for the same key share one query. Flights are per epoch,
+    # so a read arriving after a write never joins a load that started before it.
+    epoch = cache.epoch
+    flight = (key, epoch)
+    task = cache._inflight.get(flight)
+    if task is None:
+        task = asyncio.ensure_future(_fill(cache, key, epoch, load, build))
+        cache._inflight[flight] = task
+        task.add_done_callback(lambda _: cache._inflight.pop(flight, None))
+    # shielded: one caller disconnecting does not cancel the load for the others
+    return await asyncio.shield(task)
+
+
+async def read_through_many(cache: DocumentCache, kind: str, ids: list[str], load_many) -> list[CachedDocument | None]:
+    # cached entries first; every miss resolved by one load_many(missing_ids) call.
+    # -> entries in the order of ids, None where no document exists
+    entries = {id: cache.get((kind, id)) for id in dict.fromkeys(ids)}
+    missing = [id for id, entry in entries.items() if entry is None]
+    if missing:
+        epoch = cache.epoch
+        for doc in await load_many(missing):
+            entry = make_entry(doc)
+            cache.put((kind, doc["id"]), entry, epoch)
+            entries[doc["id"]] = entry
+    return [entries.get(id) for id in ids]
+
+
+def batch_response(entries: list[CachedDocument | None]) -> Response:
+    # splice the cached bodies instead of re-serializing the documents
+    body = b'{"items":[' + b",".join(e.body if e else b"null" for e in entries) + b"]}"
+    return Response(content=body, media_type="application/json")
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def conditional_response(entry: CachedDocument, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
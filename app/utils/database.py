@@ -0,0 +1,82 @@
+# utils/database.py
+# Mongo client lifecycle, driven by the FastAPI lifespan (app/main.py): fail fast
+# if the cluster is unreachable, bootstrap indexes, warm the pool and the hot
+# collections before the first request, close the client on shutdown.
+import asyncio
+import logging
+import time
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from app.config import (
+    client,
+    MONGO_ENSURE_INDEXES,
+    MONGO_MAX_STALENESS_S,
+    MONGO_PUBLIC_READ_PREFERENCE,
+    MONGO_WARMUP_CONNECTIONS,
+    PAGE_SIZE_DEFAULT,
+)
+
+logger = logging.getLogger(__name__)
+
+_READ_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def _read_preference(name: str, max_staleness: int):
+    mode = _READ_MODES.get(name)
+    if mode is None:
+        raise ValueError(f"MONGO_PUBLIC_READ_PREFERENCE must be one of {sorted(_READ_MODES)}, got {name!r}")
+    return mode() if mode is Primary else mode(max_staleness=max_staleness)
+
+
+PUBLIC_READ_PREFERENCE = _read_preference(MONGO_PUBLIC_READ_PREFERENCE, MONGO_MAX_STALENESS_S)
+
+
+def public_reads(collection):
+    # same collection, reads routed per MONGO_PUBLIC_READ_PREFERENCE (a standalone
+    # server or a replica set without secondaries simply serves them from the primary)
+    return collection.with_options(read_preference=PUBLIC_READ_PREFERENCE)
+
+
+async def connect():
+    # one round trip: a bad MONGO_URL fails the deploy instead of the first request
+    await client.admin.command("ping")
+
+
+async def bootstrap_indexes(*ensure_fns):
+    # createIndexes is a no-op for existing indexes; run every collection's at once.
+    # A failed build is logged, not raised: the app still serves, only slower
+    if not MONGO_ENSURE_INDEXES:
+        return
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fn() for fn in ensure_fns), return_exceptions=True)
+    for fn, result in zip(ensure_fns, results):
+        if isinstance(result, Exception):
+            logger.error("%s failed", fn.__name__, exc_info=result)
+    logger.info("indexes ensured in %.0fms", (time.perf_counter() - start) * 1000)
+
+
+async def warm_up(*collections):
+    # Open connections to every server the public reads may use (concurrent pings
+    # each check one out), then read the first default page of each hot collection
+    # so its documents and _id index are in the server cache and the query plans
+    # are cached. Cold-start requests otherwise pay for both.
+    start = time.perf_counter()
+    admin = client.admin
+    await asyncio.gather(
+        *(admin.command("ping") for _ in range(MONGO_WARMUP_CONNECTIONS)),
+        *(admin.command("ping", read_preference=PUBLIC_READ_PREFERENCE) for _ in range(MONGO_WARMUP_CONNECTIONS)),
+    )
+    await asyncio.gather(*(
+        collection.find({}).sort("_id", -1).limit(PAGE_SIZE_DEFAULT).to_list(length=PAGE_SIZE_DEFAULT)
+        for collection in collections
+    ))
+    logger.info("mongo pool warmed in %.0fms", (time.perf_counter() - start) * 1000)
+
+
+def close():
+    client.close()
@@ -0,0 +1,33 @@
+# utils/export.py
+from app.config import EXPORT_BATCH_SIZE, EXPORT_CHUNK_BYTES
+from app.utils.serialization import dumps
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def export_cursor(collection, projection: dict | None = None):
+    # _id order is stable under concurrent inserts; batch_size bounds what the driver holds
+    return collection.find({}, projection).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+
+
+async def stream_documents(cursor, fmt: str = "ndjson"):
+    # Documents are encoded one at a time and flushed in ~EXPORT_CHUNK_BYTES chunks.
+    # The ASGI server awaits each chunk until the client drains it, so the cursor is
+    # only advanced as fast as the client reads: memory stays at one batch + one chunk.
+    as_array = fmt == "json"
+    buffer = bytearray(b"[" if as_array else b"")
+    first = True
+    async for doc in cursor:
+        if as_array and not first:
+            buffer += b","
+        buffer += dumps(doc)
+        if not as_array:
+            buffer += b"\n"
+        first = False
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if as_array:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
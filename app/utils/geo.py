@@ -0,0 +1,79 @@
+# utils/geo.py
+# Route map geometry: GeoJSON points per stop plus the derived totals clients
+# used to compute on every render (stop count, map center/zoom, day distances).
+import math
+from fastapi import HTTPException
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geo_point(lat, lng) -> dict | None:
+    # GeoJSON is [lng, lat]; a 2dsphere index rejects out-of-range coordinates
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (lat, lng)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def _zoom(lat_span: float, lng_span: float) -> float:
+    # web-mercator zoom at which the span fits a ~1 tile wide viewport
+    span = max(lat_span, lng_span)
+    if span <= 0:
+        return 14.0
+    return float(max(1, min(16, math.floor(math.log2(360 / span)))))
+
+
+def derive_route_map(route_map: dict) -> dict:
+    # in place: stops[].location, days[].distance_km, total_stops, map_center
+    points = []
+    total = 0
+    for day in route_map.get("days") or []:
+        distance, previous = 0.0, None
+        for stop in sorted(day.get("stops") or [], key=lambda s: s.get("order", 0)):
+            total += 1
+            location = geo_point(stop.get("lat"), stop.get("lng"))
+            if location is None:
+                stop.pop("location", None)
+                continue
+            stop["location"] = location
+            lat, lng = stop["lat"], stop["lng"]
+            if previous is not None:
+                distance += haversine_km(*previous, lat, lng)
+            previous = (lat, lng)
+            points.append(previous)
+        day["distance_km"] = round(distance, 2)
+    route_map["total_stops"] = total
+    if points:
+        lats = [p[0] for p in points]
+        lngs = [p[1] for p in points]
+        route_map["map_center"] = {
+            "lat": (min(lats) + max(lats)) / 2,
+            "lng": (min(lngs) + max(lngs)) / 2,
+            "zoom": _zoom(max(lats) - min(lats), max(lngs) - min(lngs)),
+        }
+    else:
+        route_map.pop("map_center", None)
+    return route_map
+
+
+def bbox_polygon(bbox: str) -> dict:
+    # "minLng,minLat,maxLng,maxLat" -> closed GeoJSON polygon (counter-clockwise)
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLng,minLat,maxLng,maxLat")
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox out of range or empty")
+    if max_lng - min_lng >= 180:
+        # a single GeoJSON polygon must fit in one hemisphere
+        raise HTTPException(status_code=400, detail="bbox must span less than 180 degrees of longitude")
+    ring = [[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]]
+    return {"type": "Polygon", "coordinates": [ring]}
@@ -0,0 +1,46 @@
+# utils/ids.py
+import asyncio
+from pymongo import ReturnDocument
+from app.config import db, ID_BLOCK_SIZE
+from app.utils.instrumentation import traced
+
+
+class IdAllocator:
+    # Hands out sequence ids from a block reserved with one atomic $inc on the
+    # shared counters document. Each worker owns the blocks it reserved, so ids
+    # stay unique across processes; unused ids of a block are skipped on restart.
+
+    def __init__(self, counter_id: str, fmt: str, block_size: int = ID_BLOCK_SIZE):
+        self.counter_id = counter_id
+        self.fmt = fmt
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0  # exclusive
+        self._lock = asyncio.Lock()
+
+    @traced
+    async def _reserve_block(self, size: int) -> tuple[int, int]:
+        doc = await db["counters"].find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"seq": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        end = int(doc["seq"])
+        return end - size + 1, end + 1
+
+    async def reserve(self, count: int) -> list[str]:
+        async with self._lock:
+            ids = []
+            while len(ids) < count:
+                if self._next >= self._end:
+                    # large batches (imports) take one block big enough for the rest
+                    size = max(self.block_size, count - len(ids))
+                    self._next, self._end = await self._reserve_block(size)
+                take = min(self._end - self._next, count - len(ids))
+                ids.extend(self.fmt.format(seq=seq) for seq in range(self._next, self._next + take))
+                self._next += take
+            return ids
+
+    async def next_id(self) -> str:
+        return (await self.reserve(1))[0]
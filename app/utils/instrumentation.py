@@ -0,0 +1,202 @@
+# utils/instrumentation.py
+# Request timing, Mongo command monitoring and Prometheus text exposition.
+# Kept dependency-free; every record is a dict lookup and a few additions under
+# a lock (the command listener runs on Motor's executor threads).
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from pymongo import monitoring
+
+logger = logging.getLogger("app.slow_query")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# innermost @traced function of the running request/task; Motor copies the
+# context onto its executor threads, so the command listener sees it too
+current_controller: contextvars.ContextVar[str] = contextvars.ContextVar("current_controller", default="-")
+# per-request accumulator of Mongo time, set by TimingMiddleware
+_request_mongo: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_mongo", default=None)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{n}="{v}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()]
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(names, (*key, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return ("\n".join(lines) + "\n").encode()
+
+
+registry = Registry()
+
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+))
+http_mongo_duration = registry.register(Histogram(
+    "http_request_mongo_seconds", "Time spent in Mongo commands per request", ("method", "route"),
+))
+mongo_duration = registry.register(Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("collection", "command", "controller"),
+))
+mongo_failures = registry.register(Counter(
+    "mongo_command_failures_total", "Failed Mongo commands", ("collection", "command"),
+))
+
+
+def traced(fn):
+    # marks fn as the "controller" for the Mongo commands issued inside it; the
+    # outermost traced call keeps the label, so helpers it calls don't take it over
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if current_controller.get() != "-":
+            return await fn(*args, **kwargs)
+        token = current_controller.set(name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            current_controller.reset(token)
+
+    return wrapper
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = 0):
+        self.slow_ms = slow_ms  # 0 disables slow-query logging
+        self._pending: dict[tuple, tuple[str, str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # getMore names the cursor id first; the collection is its own field
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        key = (event.connection_id, event.request_id)
+        with self._lock:
+            self._pending[key] = (collection, current_controller.get(), event.database_name)
+
+    def _finish(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        meta = self._finish(event)
+        if meta is None:
+            return
+        collection, controller, database = meta
+        seconds = event.duration_micros / 1e6
+        mongo_duration.observe(seconds, collection, event.command_name, controller)
+        request = _request_mongo.get()
+        if request is not None:
+            request[0] += seconds
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            logger.warning(
+                "slow mongo command: %s %s.%s %.1fms controller=%s",
+                event.command_name, database, collection, seconds * 1000, controller,
+            )
+
+    def failed(self, event):
+        meta = self._finish(event)
+        if meta is not None:
+            mongo_failures.inc(meta[0], event.command_name)
+
+
+class TimingMiddleware:
+    # pure ASGI (no BaseHTTPMiddleware task/stream overhead); the route template
+    # ("/itineraries/{id}") is read from the scope after routing, so series stay bounded
+    def __init__(self, app, exclude: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+        status = [500]
+        mongo = [0.0]
+        token = _request_mongo.set(mongo)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_mongo.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            http_duration.observe(elapsed, scope["method"], template, status[0])
+            http_mongo_duration.observe(mongo[0], scope["method"], template)
@@ -0,0 +1,155 @@
+# utils/pagination.py
+import base64
+import binascii
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from app.utils.instrumentation import traced
+
+
+def _bad_request(detail: str):
+    return HTTPException(status_code=400, detail=detail)
+
+
+def parse_sort(sort: str | None, allowed: dict[str, str], default: str) -> tuple[str, str, int]:
+    # "title" -> ascending, "-title" -> descending; only index-backed keys are allowed
+    sort = sort or default
+    direction = -1 if sort.startswith("-") else 1
+    name = sort.lstrip("-")
+    if name not in allowed:
+        raise _bad_request(f"sort must be one of: {', '.join(sorted(allowed))}")
+    return sort, allowed[name], direction
+
+
+def parse_fields(fields: str | None, always: tuple[str, ...] = ()) -> dict | None:
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if any(n.startswith("$") for n in names):
+        raise _bad_request("invalid field name in fields")
+    projection = {n: 1 for n in names}
+    for n in always:
+        projection[n] = 1
+    return projection
+
+
+def parse_ids(ids: list[str], limit: int) -> list[str]:
+    # ?ids=a&ids=b or ?ids=a,b -> ["a", "b"], order kept
+    out = [i.strip() for value in ids for i in value.split(",") if i.strip()]
+    if not out:
+        raise _bad_request("ids is required")
+    if len(out) > limit:
+        raise _bad_request(f"at most {limit} ids per request")
+    return out
+
+
+def encode_cursor(sort: str, value, oid: ObjectId) -> str:
+    raw = json.dumps({"s": sort, "v": value, "i": str(oid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> tuple[object, ObjectId]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        oid = ObjectId(data["i"])
+    except (ValueError, KeyError, TypeError, InvalidId, binascii.Error):
+        raise _bad_request("invalid next token")
+    if data.get("s") != sort:
+        raise _bad_request("next token does not match sort")
+    return data.get("v"), oid
+
+
+def keyset_filter(field: str, direction: int, value, oid: ObjectId) -> dict:
+    op = "$gt" if direction == 1 else "$lt"
+    if field == "_id":
+        return {"_id": {op: oid}}
+    # (field, _id) tuple comparison so ties on the sort key never skip or repeat
+    return {"$or": [{field: {op: value}}, {field: value, "_id": {op: oid}}]}
+
+
+def _page(docs: list, limit: int, sort: str, field: str) -> dict:
+    next_token = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        value = None if field == "_id" else last.get(field)
+        next_token = encode_cursor(sort, value, last["_id"])
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])  # normalize
+    return {"items": docs, "next": next_token}
+
+
+@traced
+async def paginate(
+    collection,
+    query: dict,
+    *,
+    limit: int,
+    cursor: str | None,
+    sort: str | None,
+    sorts: dict[str, str],
+    default_sort: str,
+    fields: str | None = None,
+):
+    sort, field, direction = parse_sort(sort, sorts, default_sort)
+    projection = parse_fields(fields, always=("id", field) if field != "_id" else ("id",))
+    if cursor:
+        value, oid = decode_cursor(cursor, sort)
+        keyset = keyset_filter(field, direction, value, oid)
+        query = {"$and": [query, keyset]} if query else keyset
+
+    sort_spec = [("_id", direction)] if field == "_id" else [(field, direction), ("_id", direction)]
+    # fetch one extra row to know whether another page exists
+    docs = await collection.find(query, projection).sort(sort_spec).limit(limit + 1).to_list(length=limit + 1)
+
+    return _page(docs, limit, sort, field)
+
+
+@traced
+async def faceted_page(
+    collection,
+    query: dict,
+    *,
+    facets: dict[str, str],
+    limit: int,
+    cursor: str | None,
+    sort: str | None,
+    sorts: dict[str, str],
+    default_sort: str,
+    fields: str | None = None,
+):
+    # later pages carry no facets, so they are a plain indexed keyset find
+    if cursor:
+        return await paginate(
+            collection, query, limit=limit, cursor=cursor, sort=sort,
+            sorts=sorts, default_sort=default_sort, fields=fields,
+        )
+
+    # first page: one aggregation where the leading $match uses the filter indexes,
+    # then $facet splits into the page itself and a count per value of every facet
+    sort, field, direction = parse_sort(sort, sorts, default_sort)
+    projection = parse_fields(fields, always=("id", field) if field != "_id" else ("id",))
+    sort_spec = {"_id": direction} if field == "_id" else {field: direction, "_id": direction}
+
+    items_stage = [{"$sort": sort_spec}, {"$limit": limit + 1}]
+    if projection:
+        items_stage.append({"$project": projection})
+    facet_spec = {"items": items_stage}
+    for name, path in facets.items():
+        facet_spec[f"facet_{name}"] = [
+            {"$unwind": f"${path}"},
+            {"$group": {"_id": f"${path}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+
+    pipeline = [{"$match": query}, {"$facet": facet_spec}]
+    result = (await collection.aggregate(pipeline).to_list(length=1))[0]
+
+    page = _page(result["items"], limit, sort, field)
+    page["facets"] = {
+        name: {str(row["_id"]): row["count"] for row in result[f"facet_{name}"]}
+        for name in facets
+    }
+    return page
@@ -0,0 +1,264 @@
+# utils/patch.py
+# JSON Patch (RFC 6902 add/replace/remove) -> one targeted Mongo update.
+# Only the sub-model a path points at is validated, and array indexes refer to
+# the document as it was before the patch (operations are applied together).
+# A path into an element of a discriminated union (content blocks) is validated
+# against the stored element's type, and the update is guarded on that type.
+# Replaces and index removes are guarded on the target existing: Mongo would
+# otherwise pad the array with nulls up to a missing index.
+import types
+import typing
+import uuid
+from functools import lru_cache
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo import ReturnDocument
+from app.utils.instrumentation import traced
+
+# maintained by the server, never patchable
+PROTECTED = {"_id", "id", "version", "schema_version", "last_updated"}
+
+
+def _bad_patch(detail, status_code: int = 400):
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def parse_pointer(path) -> list[str]:
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise _bad_patch(f"invalid path: {path!r}")
+    segments = [s.replace("~1", "/").replace("~0", "~") for s in path[1:].split("/")]
+    for s in segments:
+        # keep segments from turning into extra dotted paths or operators in Mongo
+        if not s or "." in s or s.startswith("$"):
+            raise _bad_patch(f"invalid path: {path!r}")
+    return segments
+
+
+def _members(tp) -> list:
+    # Optional[X] / Union[A, B] / Annotated[X, ...] -> the concrete types to walk into
+    origin = typing.get_origin(tp)
+    if origin is typing.Annotated:
+        return _members(typing.get_args(tp)[0])
+    if origin in (typing.Union, types.UnionType):
+        return [m for a in typing.get_args(tp) if a is not type(None) for m in _members(a)]
+    return [tp]
+
+
+@lru_cache(maxsize=64)
+def _discriminator(tp) -> tuple[str, dict] | None:
+    # Annotated[Union[...], Field(discriminator=...)] -> (field, {tag: member}), else None
+    if typing.get_origin(tp) is not typing.Annotated:
+        return None
+    field = next((m.discriminator for m in typing.get_args(tp)[1:] if isinstance(getattr(m, "discriminator", None), str)), None)
+    if field is None:
+        return None
+    tags = {}
+    for member in _members(tp):
+        for tag in typing.get_args(member.model_fields[field].annotation):
+            tags[tag] = member
+    return field, tags
+
+
+# stored value unknown (no document loaded) / not present in the stored document
+_UNKNOWN, _MISSING = object(), object()
+
+
+def _child(node, seg: str):
+    if node is _UNKNOWN:
+        return _UNKNOWN
+    if isinstance(node, dict):
+        return node.get(seg, _MISSING)
+    if isinstance(node, list) and seg.isdigit() and int(seg) < len(node):
+        return node[int(seg)]
+    return _MISSING
+
+
+def _resolve(model: type[BaseModel], segments: list[str], stored=_UNKNOWN) -> tuple[list, str, bool, dict, list[int]]:
+    # -> (candidate annotations at the path, container kind of the last segment, required,
+    #     {dotted discriminator path: stored tag} the update must be guarded on,
+    #     positions of the segments that are array indexes)
+    candidates, container, required, guards, indexes = [model], "field", False, {}, []
+    node = stored
+    for depth, seg in enumerate(segments):
+        found, required = [], False
+        for tp in candidates:
+            members = _members(tp)
+            tagged = _discriminator(tp)
+            if tagged:
+                # into one element: only the member its stored tag names applies
+                field, tags = tagged
+                at = "/".join(segments[:depth])
+                if node is _MISSING:
+                    raise _bad_patch(f"path does not exist: /{at}")
+                if node is not _UNKNOWN:
+                    tag = node.get(field) if isinstance(node, dict) else None
+                    if tag not in tags:
+                        raise _bad_patch(f"/{at} has no valid {field}", status_code=422)
+                    members = [tags[tag]]
+                    guards[".".join([*segments[:depth], field])] = tag
+                else:
+                    guards[".".join([*segments[:depth], field])] = None
+            for member in members:
+                origin = typing.get_origin(member)
+                if isinstance(member, type) and issubclass(member, BaseModel):
+                    field = member.model_fields.get(seg)
+                    if field is not None:
+                        found.append(field.annotation)
+                        container = "field"
+                        required = required or field.is_required()
+                elif origin is list and (seg == "-" or seg.isdigit()):
+                    found.append(typing.get_args(member)[0])
+                    container = "index"
+                elif origin is dict:
+                    found.append(typing.get_args(member)[1])
+                    container = "key"
+        if not found:
+            raise _bad_patch(f"unknown path: /{'/'.join(segments)}")
+        if container == "index":
+            indexes.append(depth)
+        candidates = found
+        node = _child(node, seg)
+    return candidates, container, required, guards, indexes
+
+
+def patch_projection(model: type[BaseModel], ops: list[dict]) -> dict | None:
+    # the stored discriminators build_patch_update needs (e.g. content_blocks.type),
+    # or None when no path goes into a discriminated union element
+    projection = {}
+    for op in ops:
+        if isinstance(op, dict):
+            _, _, _, guards, _ = _resolve(model, parse_pointer(op.get("path")))
+            for path in guards:
+                projection[".".join(s for s in path.split(".") if not s.isdigit())] = 1
+    return projection or None
+
+
+@lru_cache(maxsize=256)
+def _adapter(tp) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def _validate(candidates: list, value, path: str):
+    # a path into a union (not narrowed to one member) may match several: any may accept it
+    errors = []
+    for tp in candidates:
+        try:
+            validated = _adapter(tp).validate_python(value)
+        except ValidationError as e:
+            errors.extend(e.errors(include_url=False, include_input=False, include_context=False))
+            continue
+        return _adapter(tp).dump_python(validated, mode="json", exclude_none=True)
+    raise _bad_patch({"path": path, "errors": errors}, status_code=422)
+
+
+def _check_conflicts(paths: list[str]):
+    # Mongo rejects one update touching a path and its parent/child
+    ordered = sorted(paths)
+    for a, b in zip(ordered, ordered[1:]):
+        if a == b or b.startswith(a + "."):
+            raise _bad_patch(f"conflicting operations on '{a}' and '{b}'")
+
+
+def _exists(segments: list[str]) -> dict:
+    return {".".join(segments): {"$exists": True}}
+
+
+def build_patch_update(model: type[BaseModel], ops: list[dict], stored: dict | None = None) -> tuple[dict, dict, dict]:
+    # stored: the document projected with patch_projection (when that is not None).
+    # -> (update document, {array: marker} for removed elements compact_arrays pulls out,
+    #     filter conditions pinning the stored discriminators and the existing paths
+    #     the ops were validated against)
+    set_doc, unset_doc, push_doc, compact, guards = {}, {}, {}, [], {}
+    # removed array elements are overwritten with this, then pulled by value: only
+    # this patch's holes go, never a null that was stored before
+    removed = {"_removed": uuid.uuid4().hex}
+    for op in ops:
+        kind, path = op.get("op"), op.get("path")
+        segments = parse_pointer(path)
+        if segments[0] in PROTECTED:
+            raise _bad_patch(f"{path} is maintained by the server")
+        candidates, container, required, op_guards, indexes = _resolve(
+            model, segments, _UNKNOWN if stored is None else stored
+        )
+        guards.update({k: tag for k, tag in op_guards.items() if tag is not None})
+        dotted = ".".join(segments)
+        parent, last = ".".join(segments[:-1]), segments[-1]
+        if kind == "replace" or (kind == "remove" and container == "index"):
+            guards.update(_exists(segments))  # RFC 6902: the target must exist
+        elif indexes:
+            # an element the path goes through must exist; an add may insert at the
+            # end, so its own position is checked against the element before it
+            depth = indexes[-1]
+            if depth < len(segments) - 1:
+                guards.update(_exists(segments[:depth + 1]))
+            elif kind == "add" and last.isdigit() and int(last) > 0:
+                guards.update(_exists([*segments[:-1], str(int(last) - 1)]))
+
+        if kind in ("add", "replace"):
+            if "value" not in op:
+                raise _bad_patch(f"{kind} {path} needs a value")
+            value = _validate(candidates, op["value"], path)
+            if container == "index" and kind == "add":
+                push = push_doc.setdefault(parent, {"$each": []})
+                if "$position" in push or (last != "-" and push["$each"]):
+                    raise _bad_patch(f"only one positional add per array: {path}")
+                push["$each"].append(value)
+                if last != "-":
+                    push["$position"] = int(last)
+            elif last == "-":
+                raise _bad_patch(f"'-' is only valid for add: {path}")
+            else:
+                set_doc[dotted] = value
+        elif kind == "remove":
+            if container == "index":
+                if last == "-":
+                    raise _bad_patch(f"'-' is only valid for add: {path}")
+                # the element becomes the marker; compact_arrays pulls it out afterwards
+                set_doc[dotted] = removed
+                compact.append(parent)
+            elif required:
+                raise _bad_patch(f"{path} is required and cannot be removed")
+            else:
+                unset_doc[dotted] = ""
+        else:
+            raise _bad_patch(f"unsupported op: {kind!r} (add, replace, remove)")
+
+    _check_conflicts([*set_doc, *unset_doc, *push_doc])
+    update = {}
+    if set_doc:
+        update["$set"] = set_doc
+    if unset_doc:
+        update["$unset"] = unset_doc
+    if push_doc:
+        update["$push"] = push_doc
+    # deepest arrays first, so outer indexes in the remaining paths are still valid
+    arrays = sorted(set(compact), key=lambda p: p.count("."), reverse=True)
+    return update, {path: removed for path in arrays}, guards
+
+
+async def check_guards(collection, query: dict, guards: dict):
+    # a guarded patch matched nothing: if the document is there, a path it targets
+    # does not exist (422) or an element it went into changed type after it was read (409)
+    if not guards or not await collection.find_one(query, {"_id": 1}):
+        return
+    for path, condition in guards.items():
+        if await collection.find_one({**query, path: condition}, {"_id": 1}) is None:
+            if isinstance(condition, dict):
+                raise _bad_patch(f"path does not exist: /{path.replace('.', '/')}", status_code=422)
+            raise _bad_patch("the patched content changed type since it was read; retry", status_code=409)
+    raise _bad_patch("the patched document changed since it was read; retry", status_code=409)
+
+
+@traced
+async def compact_arrays(collection, query: dict, compact: dict, version: int):
+    # pinned to the version the patch produced; if another write landed in between,
+    # the markers are unique to this patch and are pulled regardless
+    doc = None
+    for path, marker in compact.items():
+        update = {"$pull": {path: marker}}
+        doc = await collection.find_one_and_update(
+            {**query, "version": version}, update, return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            doc = await collection.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+    return doc
@@ -0,0 +1,121 @@
+# utils/search_index.py
+# In-memory inverted index with field weights, prefix expansion and BM25 ranking.
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the to with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    # lowercase, strip accents ("Ladākh" -> "ladakh"), split on non-alphanumerics
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = text.encode("ascii", "ignore").decode()
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+class InvertedIndex:
+    # postings: term -> {doc_key: weighted term frequency}
+    # docs: doc_key -> {"meta": {...}, "length": float, "terms": {term: tf}}
+    # The forward "terms" map makes removal exact and is all a snapshot needs.
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self.docs: dict[str, dict] = {}
+        self.vocabulary: list[str] = []  # sorted, for prefix lookups
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, key: str, fields: list[tuple[str, float]], meta: dict):
+        # fields: (text, weight) pairs; a title hit counts more than a note hit
+        self.remove(key)
+        terms: dict[str, float] = defaultdict(float)
+        for text, weight in fields:
+            for token in tokenize(text):
+                terms[token] += weight
+        self._insert(key, dict(terms), meta)
+
+    def _insert(self, key: str, terms: dict[str, float], meta: dict):
+        length = sum(terms.values())
+        self.docs[key] = {"meta": meta, "length": length, "terms": terms}
+        self._total_length += length
+        for term, tf in terms.items():
+            postings = self.postings[term]
+            if not postings:
+                insort(self.vocabulary, term)
+            postings[key] = tf
+
+    def remove(self, key: str):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[term]
+                i = bisect_left(self.vocabulary, term)
+                if i < len(self.vocabulary) and self.vocabulary[i] == term:
+                    del self.vocabulary[i]
+
+    def expand_prefix(self, prefix: str, limit: int = 50) -> list[str]:
+        i = bisect_left(self.vocabulary, prefix)
+        out = []
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix) and len(out) < limit:
+            out.append(self.vocabulary[i])
+            i += 1
+        return out
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True, filter_fn=None) -> list[tuple[str, float]]:
+        tokens = tokenize(query)
+        if not tokens or not self.docs:
+            return []
+        avg_length = self._total_length / len(self.docs) or 1.0
+        scores: dict[str, float] = defaultdict(float)
+        for i, token in enumerate(tokens):
+            # the last token is still being typed: match it as a prefix
+            expansions = self.expand_prefix(token) if prefix and i == len(tokens) - 1 else [token]
+            best: dict[str, float] = {}
+            for term in expansions:
+                idf = self._idf(term)
+                # exact matches outrank prefix completions of the same token
+                boost = 1.0 if term == token else 0.8
+                for key, tf in self.postings.get(term, {}).items():
+                    norm = self.k1 * (1 - self.b + self.b * self.docs[key]["length"] / avg_length)
+                    score = boost * idf * tf * (self.k1 + 1) / (tf + norm)
+                    if score > best.get(key, 0.0):
+                        best[key] = score
+            for key, score in best.items():
+                scores[key] += score
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if filter_fn is not None:
+            ranked = [kv for kv in ranked if filter_fn(self.docs[kv[0]]["meta"])]
+        return ranked[:limit]
+
+    def dump(self) -> dict:
+        return {key: {"meta": d["meta"], "terms": d["terms"]} for key, d in self.docs.items()}
+
+    def load(self, data: dict):
+        self.postings.clear()
+        self.docs.clear()
+        self.vocabulary = []
+        self._total_length = 0.0
+        for key, d in data.items():
+            self._insert(key, d["terms"], d["meta"])
@@ -0,0 +1,43 @@
+# utils/serialization.py
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+def _default(obj):
+    # orjson only calls back for types it doesn't know natively (datetime, UUID and
+    # dataclasses are handled in Rust), i.e. the Mongo _id, not once per node
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+loads = orjson.loads
+
+
+def to_document(model: BaseModel) -> dict:
+    # what gets stored for a validated model: JSON-mode dump straight from pydantic-core
+    return model.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+def strip_none(value):
+    # request bodies taken as raw dicts are already JSON types; only drop the nulls
+    if isinstance(value, dict):
+        return {k: strip_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [strip_none(v) for v in value]
+    return value
+
+
+class MongoJSONResponse(Response):
+    # Returned directly by the routes: FastAPI skips jsonable_encoder for Response
+    # instances, so Mongo documents go from dict to bytes in one orjson call.
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
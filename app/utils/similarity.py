@@ -0,0 +1,76 @@
+# utils/similarity.py
+# Sparse IDF-weighted cosine similarity over categorical features ("dest:manali",
+# "cat:mountains", ...). Scoring one document walks only the posting lists of its
+# own features, so cost follows the overlap, not the corpus size.
+import heapq
+import math
+from collections import defaultdict
+
+
+class FeatureIndex:
+    def __init__(self):
+        self.features: dict[str, frozenset[str]] = {}  # doc key -> features
+        self.postings: dict[str, set[str]] = defaultdict(set)  # feature -> doc keys
+
+    def __len__(self):
+        return len(self.features)
+
+    def put(self, key: str, features: set[str]) -> frozenset[str]:
+        # -> the previous features (empty for a new document)
+        old = self.remove(key)
+        features = frozenset(features)
+        self.features[key] = features
+        for f in features:
+            self.postings[f].add(key)
+        return old
+
+    def remove(self, key: str) -> frozenset[str]:
+        old = self.features.pop(key, frozenset())
+        for f in old:
+            keys = self.postings.get(f)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[f]
+        return old
+
+    def _idf(self, feature: str) -> float:
+        return math.log(1 + len(self.features) / (1 + len(self.postings.get(feature, ()))))
+
+    def scores(self, key: str) -> dict[str, float]:
+        # cosine of key against every document sharing at least one feature
+        features = self.features.get(key)
+        if not features:
+            return {}
+        weights: dict[str, float] = {}  # squared idf, memoized for this call
+
+        def weight(f: str) -> float:
+            w = weights.get(f)
+            if w is None:
+                w = weights[f] = self._idf(f) ** 2
+            return w
+
+        def norm(fs) -> float:
+            return math.sqrt(sum(weight(f) for f in fs)) or 1.0
+
+        dots: dict[str, float] = defaultdict(float)
+        for f in features:
+            w = weight(f)
+            for other in self.postings[f]:
+                if other != key:
+                    dots[other] += w
+        own = norm(features)
+        return {other: dot / (own * norm(self.features[other])) for other, dot in dots.items()}
+
+    def neighbours(self, features) -> set[str]:
+        # every document sharing a feature with the given set
+        out = set()
+        for f in features:
+            out |= self.postings.get(f, set())
+        return out
+
+
+def top_k(scores: dict[str, float], k: int, accept=None) -> list[tuple[str, float]]:
+    items = scores.items() if accept is None else ((key, s) for key, s in scores.items() if accept(key))
+    # ties broken by key so results are stable across rebuilds
+    return heapq.nsmallest(k, items, key=lambda kv: (-kv[1], kv[0]))
@@ -0,0 +1,125 @@
+# utils/slugs.py
+import logging
+import re
+from fastapi import HTTPException
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.utils.instrumentation import traced
+
+logger = logging.getLogger(__name__)
+
+# how often a write is retried after losing a slug race to a concurrent writer
+SLUG_MAX_ATTEMPTS = 5
+
+# slug is optional on stored documents, so only string slugs take part in uniqueness
+SLUG_INDEX = IndexModel(
+    [("slug", ASCENDING)],
+    name="slug_unique",
+    unique=True,
+    partialFilterExpression={"slug": {"$type": "string"}},
+)
+
+
+def slugify(text: str) -> str:
+    s = text.lower().strip()
+    s = re.sub(r"[^a-z0-9]+", "-", s)
+    s = re.sub(r"-+", "-", s)
+    return s.strip("-")
+
+
+@traced
+async def allocate_slug(collection, base_slug: str, exclude_id: str | None = None) -> str:
+    # one query: the anchored, case-sensitive regex is a bounded scan of the slug
+    # index over `base` and `base-N`, instead of one find_one per candidate
+    query = {"slug": {"$regex": f"^{re.escape(base_slug)}(-[0-9]+)?$"}}
+    if exclude_id:
+        query["id"] = {"$ne": exclude_id}
+    taken = set()
+    async for doc in collection.find(query, {"slug": 1, "_id": 0}):
+        taken.add(doc["slug"])
+    if base_slug not in taken:
+        return base_slug
+    # first free suffix, resolved in memory against the candidates already fetched
+    i = 2
+    while f"{base_slug}-{i}" in taken:
+        i += 1
+    return f"{base_slug}-{i}"
+
+
+@traced
+async def allocate_slugs(collection, base_slugs: list[str]) -> list[str]:
+    # batch form of allocate_slug: one $in over all the anchored patterns, then
+    # slugs are handed out in memory so repeated bases inside the batch get -2, -3...
+    patterns = [re.compile(f"^{re.escape(b)}(-[0-9]+)?$") for b in set(base_slugs)]
+    taken = set()
+    if patterns:
+        async for doc in collection.find({"slug": {"$in": patterns}}, {"slug": 1, "_id": 0}):
+            taken.add(doc["slug"])
+    slugs = []
+    for base_slug in base_slugs:
+        slug = base_slug
+        i = 2
+        while slug in taken:
+            slug = f"{base_slug}-{i}"
+            i += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def is_slug_conflict(details: dict | None) -> bool:
+    # details of a DuplicateKeyError, or one writeErrors entry of a BulkWriteError
+    details = details or {}
+    if details.get("code", 11000) != 11000:
+        return False
+    if "keyPattern" in details:
+        return "slug" in details["keyPattern"]
+    return "slug" in details.get("errmsg", "")
+
+
+async def write_with_unique_slug(collection, base_slug: str, write, exclude_id: str | None = None):
+    # the unique slug index is the real guarantee; allocation is only a good first
+    # guess, so a concurrent writer taking the same slug just means allocate again
+    for _ in range(SLUG_MAX_ATTEMPTS):
+        slug = await allocate_slug(collection, base_slug, exclude_id)
+        try:
+            return await write(slug)
+        except DuplicateKeyError as exc:
+            if not is_slug_conflict(exc.details):
+                raise
+    raise HTTPException(status_code=409, detail=f"could not allocate a unique slug for '{base_slug}'")
+
+
+async def dedupe_slugs(collection) -> list[dict]:
+    # documents written before the unique index may share a slug: the oldest keeps
+    # it, the others get the first free slug-N. -> the renamed documents
+    pipeline = [
+        {"$match": {"slug": {"$type": "string"}}},
+        {"$group": {"_id": "$slug", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    renamed = []
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        for _id in sorted(group["ids"])[1:]:
+            slug = await allocate_slug(collection, group["_id"])
+            doc = await collection.find_one_and_update(
+                {"_id": _id, "slug": group["_id"]},
+                {"$set": {"slug": slug}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc:
+                logger.warning("%s %s: duplicate slug %r renamed to %r", collection.name, doc.get("id"), group["_id"], slug)
+                renamed.append(doc)
+    return renamed
+
+
+async def prepare_slug_index(collection) -> list[dict]:
+    # run before creating SLUG_INDEX, so duplicate legacy slugs cannot fail the
+    # build; free once the partial index exists. -> the renamed documents
+    existing = (await collection.index_information()).get(SLUG_INDEX.document["name"])
+    if existing and existing.get("partialFilterExpression"):
+        return []
+    if existing:
+        # an earlier non-partial slug_unique: same name, different options
+        await collection.drop_index(SLUG_INDEX.document["name"])
+    return await dedupe_slugs(collection)
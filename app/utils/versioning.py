@@ -0,0 +1,76 @@
+# utils/versioning.py
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.utils.instrumentation import traced
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    # If-Match carries the document version the client last saw: "3", W/"3" or 3
+    if not if_match:
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be a document version, e.g. \"3\"")
+    return int(value)
+
+
+def parse_body_version(value) -> int | None:
+    # "version" in a PUT body: the same check as If-Match, as a JSON integer
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise HTTPException(status_code=400, detail="version must be a document version, e.g. 3")
+    return value
+
+
+def _version_filter(expected: int) -> dict:
+    # documents written before versioning have no field and count as version 1
+    if expected == 1:
+        return {"$or": [{"version": 1}, {"version": {"$exists": False}}]}
+    return {"version": expected}
+
+
+@traced
+async def versioned_update(collection, query: dict, update: dict, expected_version: int | None = None):
+    # one round trip: the write, the version bump, last_updated and the returned
+    # document all come from a single find_one_and_update
+    update = dict(update)
+    set_doc = {k: v for k, v in update.get("$set", {}).items() if k not in ("_id", "version", "schema_version")}
+    set_doc["last_updated"] = now_iso()
+    update["$set"] = set_doc
+    if expected_version is not None:
+        # the filter pins the current version, so the next one is known; $inc would
+        # turn a legacy document's missing version into 1 instead of 2
+        set_doc["version"] = expected_version + 1
+        filter_doc = {**query, **_version_filter(expected_version)}
+        doc = await collection.find_one_and_update(filter_doc, update, return_document=ReturnDocument.AFTER)
+    else:
+        update["$inc"] = {"version": 1}
+        doc = await collection.find_one_and_update(
+            {**query, "version": {"$exists": True}}, update, return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            # legacy documents (no version field, counted as 1) and not found
+            del update["$inc"]
+            set_doc["version"] = 2
+            doc = await collection.find_one_and_update(
+                {**query, "version": {"$exists": False}}, update, return_document=ReturnDocument.AFTER
+            )
+    if doc is None and expected_version is not None:
+        # only the failure path pays a second query, to tell 409 from not found
+        current = await collection.find_one(query, {"version": 1})
+        if current is not None:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "version conflict",
+                    "expected_version": expected_version,
+                    "current_version": current.get("version", 1),
+                },
+            )
+    return doc
@@ -0,0 +1,90 @@
+# benchmarks/bench_serialization.py
+# Compares the old response/write path (jsonable_encoder + json.dumps) with the
+# orjson / model_dump path on synthetic itineraries and travelogues.
+#
+#   python -m benchmarks.bench_serialization [--docs 50] [--days 10] [--blocks 80] [--json]
+import argparse
+import json
+import statistics
+import time
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.models.itineraries import Itinerary
+from app.models.travoulage import Travelogue
+from app.utils.serialization import dumps, to_document
+from benchmarks.fixtures import itinerary, travelogue
+
+
+def _starlette_json(content) -> bytes:
+    # what JSONResponse.render does after FastAPI's jsonable_encoder pass
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _time(fn, items, repeat: int) -> float:
+    # best-of-`repeat` mean microseconds per item
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append((time.perf_counter() - start) / len(items) * 1e6)
+    return min(runs)
+
+
+def _stored(doc: dict) -> dict:
+    doc = dict(doc)
+    doc["_id"] = ObjectId()
+    return doc
+
+
+def run(docs: int, days: int, blocks: int, repeat: int) -> list[dict]:
+    itins = [Itinerary.model_validate(itinerary(i, days=days)) for i in range(docs)]
+    travs = [Travelogue.model_validate(travelogue(i, blocks=blocks)) for i in range(docs)]
+    results = []
+    for name, models in (("itinerary", itins), ("travelogue", travs)):
+        stored = [_stored(to_document(m)) for m in models]
+        cases = {
+            "write": (
+                lambda m: jsonable_encoder(m, by_alias=True, exclude_none=True),
+                to_document,
+                models,
+            ),
+            "read": (
+                lambda d: _starlette_json(jsonable_encoder({**d, "_id": str(d["_id"])})),
+                dumps,
+                stored,
+            ),
+        }
+        for case, (old, new, items) in cases.items():
+            old_us, new_us = _time(old, items, repeat), _time(new, items, repeat)
+            results.append({
+                "document": name,
+                "path": case,
+                "bytes": int(statistics.mean(len(dumps(d)) for d in stored)),
+                "old_us": round(old_us, 1),
+                "new_us": round(new_us, 1),
+                "speedup": round(old_us / new_us, 2),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_serialization")
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--blocks", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args(argv)
+
+    results = run(args.docs, args.days, args.blocks, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'document':<11} {'path':<6} {'bytes':>8} {'old us':>10} {'new us':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['document']:<11} {r['path']:<6} {r['bytes']:>8} {r['old_us']:>10} {r['new_us']:>10} {r['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
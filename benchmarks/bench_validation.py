@@ -0,0 +1,100 @@
+# benchmarks/bench_validation.py
+# Validation and dump cost of Travelogue / Itinerary on large synthetic documents,
+# plus tagged vs untagged ContentBlock dispatch. Save a run with --json and pass
+# it back with --baseline to fail (exit 1) on regressions.
+#
+#   python -m benchmarks.bench_validation [--docs 20] [--blocks 300] [--days 30] [--json]
+#   python -m benchmarks.bench_validation --baseline before.json [--tolerance 0.25]
+import argparse
+import json
+import sys
+import time
+import typing
+from pydantic import TypeAdapter
+from app.models.itineraries import Itinerary
+from app.models.travoulage import ContentBlock, Travelogue
+from benchmarks.fixtures import itinerary, travelogue
+
+
+def _time(fn, items, repeat: int) -> float:
+    # best-of-`repeat` mean microseconds per item
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append((time.perf_counter() - start) / len(items) * 1e6)
+    return min(runs)
+
+
+def _untagged_blocks() -> TypeAdapter:
+    # the same members without the discriminator: pydantic tries them in turn
+    union = typing.get_args(ContentBlock)[0]
+    return TypeAdapter(list[union])
+
+
+def run(docs: int, blocks: int, days: int, activities: int, stops: int, repeat: int) -> list[dict]:
+    itin_raw = [itinerary(i, days=days, activities=activities, stops=stops) for i in range(docs)]
+    trav_raw = [travelogue(i, blocks=blocks) for i in range(docs)]
+    itins = [Itinerary.model_validate(d) for d in itin_raw]
+    travs = [Travelogue.model_validate(d) for d in trav_raw]
+    tagged, untagged = TypeAdapter(list[ContentBlock]), _untagged_blocks()
+    block_lists = [d["content_blocks"] for d in trav_raw]
+
+    cases = [
+        ("itinerary", "validate", Itinerary.model_validate, itin_raw),
+        ("itinerary", "dump", lambda m: m.model_dump(mode="json", exclude_none=True), itins),
+        ("itinerary", "dump_json", lambda m: m.model_dump_json(exclude_none=True), itins),
+        ("travelogue", "validate", Travelogue.model_validate, trav_raw),
+        ("travelogue", "dump", lambda m: m.model_dump(mode="json", exclude_none=True), travs),
+        ("travelogue", "dump_json", lambda m: m.model_dump_json(exclude_none=True), travs),
+        ("content_blocks", "tagged", tagged.validate_python, block_lists),
+        ("content_blocks", "untagged", untagged.validate_python, block_lists),
+    ]
+    return [
+        {"document": doc, "case": case, "us": round(_time(fn, items, repeat), 1)}
+        for doc, case, fn, items in cases
+    ]
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    before = {(r["document"], r["case"]): r["us"] for r in baseline}
+    regressions = []
+    for r in results:
+        old = before.get((r["document"], r["case"]))
+        if old and r["us"] > old * (1 + tolerance):
+            regressions.append(f"{r['document']} {r['case']}: {old} -> {r['us']} us")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_validation")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--activities", type=int, default=10)
+    parser.add_argument("--stops", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    parser.add_argument("--baseline", help="JSON output of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.docs, args.blocks, args.days, args.activities, args.stops, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'document':<15} {'case':<10} {'us/doc':>12}")
+        for r in results:
+            print(f"{r['document']:<15} {r['case']:<10} {r['us']:>12}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
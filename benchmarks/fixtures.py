@@ -0,0 +1,150 @@
+# benchmarks/fixtures.py -- deterministic synthetic documents shaped like production content
+import random
+
+DESTINATIONS = ["Manali", "Kasol", "Leh", "Goa", "Munnar", "Jaipur", "Udaipur", "Rishikesh", "Hampi", "Coorg"]
+CATEGORIES = ["mountains", "adventure", "beach", "heritage", "wildlife", "spiritual", "food", "romantic"]
+SEASONS = ["winter", "summer", "monsoon", "spring", "autumn"]
+PERFECT_FOR = ["couples", "solo", "family", "friends", "backpackers"]
+WORDS = (
+    "river valley trek sunrise market temple cafe fort lake pass snow forest village "
+    "monastery spice boat beach sunset trail waterfall bazaar palace hills camp"
+).split()
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def _image(rng: random.Random, full: bool = False) -> dict:
+    img = {
+        "image_url": f"https://cdn.example.com/img/{rng.randrange(10**9)}.jpg",
+        "alt_text": _text(rng, 4),
+        "width": 1600,
+        "height": 900,
+        "aspect_ratio": "16:9",
+        "focal_point": {"x": 0.5, "y": 0.4},
+        "mime_type": "image/jpeg",
+        "orientation": "landscape",
+    }
+    if full:
+        img["blurhash"] = "LEHV6nWB2yk8pyo0adR*.7kCMdnj"
+        img["size_bytes"] = rng.randrange(50_000, 900_000)
+        img["cdn_variant"] = {"quality": 80, "format": "webp", "resize": "fit", "max_width": 1600}
+    return img
+
+
+def itinerary(seed: int = 0, days: int = 7, activities: int = 6, stops: int = 5) -> dict:
+    rng = random.Random(seed)
+    dests = rng.sample(DESTINATIONS, 2)
+    base_lat, base_lng = rng.uniform(8, 34), rng.uniform(70, 95)
+    return {
+        "title": f"{dests[0]} {days}-Day {rng.choice(['Getaway', 'Escape', 'Trail', 'Circuit'])} {seed}",
+        "subtitle": _text(rng, 8),
+        "status": rng.choice(["draft", "published", "published"]),
+        "cover_image": _image(rng),
+        "destinations": dests,
+        "categories": rng.sample(CATEGORIES, 2),
+        "duration_days": days,
+        "budget_tier": rng.choice(["budget", "mid", "luxury"]),
+        "best_season": rng.sample(SEASONS, 2),
+        "perfect_for": rng.sample(PERFECT_FOR, 2),
+        "highlights": [_text(rng, 6) for _ in range(6)],
+        "daywise_plan": [
+            {
+                "day": d + 1,
+                "title": _text(rng, 4),
+                "notes": _text(rng, 20),
+                "activities": [
+                    {
+                        "id": f"a{d}-{a}",
+                        "time": f"{8 + a}:00",
+                        "title": _text(rng, 4),
+                        "subtitle": _text(rng, 10),
+                        "type": "activity",
+                        "location": rng.choice(dests),
+                        "distance_km": round(rng.uniform(0.5, 40), 1),
+                        "duration_minutes": rng.randrange(20, 240),
+                        "icon": rng.choice(["car", "trek", "food", "camera", "hotel"]),
+                        "activitytags": rng.sample(WORDS, 3),
+                        "activity_images": [_image(rng)],
+                    }
+                    for a in range(activities)
+                ],
+                "day_images": [{"image_url": f"https://cdn.example.com/day/{d}-{i}.jpg", "sort_order": i} for i in range(2)],
+            }
+            for d in range(days)
+        ],
+        "do_and_donts": {"dos": [_text(rng, 6) for _ in range(5)], "donts": [_text(rng, 6) for _ in range(5)]},
+        "how_to_reach": {"modes": [{"title": "Flight", "description": _text(rng, 15), "icon": "plane", "color": "blue"}]},
+        "trip_gallery": [{"id": f"g{i}", "image_url": f"https://cdn.example.com/g/{seed}-{i}.jpg", "caption": _text(rng, 5)} for i in range(8)],
+        "travel_notes": [{"text": _text(rng, 12), "type": rng.choice(["info", "warning", "tip"])} for _ in range(4)],
+        "filters": {"filter_keys": rng.sample(WORDS, 4)},
+        "route_map": {
+            "interactive": True,
+            "days": [
+                {
+                    "day": d + 1,
+                    "title": _text(rng, 3),
+                    "stops": [
+                        {
+                            "order": s + 1,
+                            "name": _text(rng, 2),
+                            "lat": round(base_lat + rng.uniform(-0.5, 0.5), 5),
+                            "lng": round(base_lng + rng.uniform(-0.5, 0.5), 5),
+                            "type": rng.choice(["stay", "sight", "food", "activity"]),
+                            "duration_minutes": rng.randrange(15, 180),
+                            "tags": rng.sample(WORDS, 2),
+                        }
+                        for s in range(stops)
+                    ],
+                }
+                for d in range(days)
+            ],
+        },
+    }
+
+
+def travelogue(seed: int = 0, blocks: int = 40) -> dict:
+    rng = random.Random(seed)
+    dests = rng.sample(DESTINATIONS, 2)
+    makers = [
+        lambda: {"type": "text", "content": _text(rng, 80), "style": "body"},
+        lambda: {"type": "image", "image": _image(rng, full=True), "caption": _text(rng, 6)},
+        lambda: {"type": "quote", "content": _text(rng, 15)},
+        lambda: {"type": "tags", "items": rng.sample(WORDS, 5)},
+        lambda: {"type": "gallery", "title": _text(rng, 3), "images": [_image(rng, full=True) for _ in range(4)]},
+        lambda: {
+            "type": "budget_breakdown", "title": "Budget", "currency": "INR", "total": 42000,
+            "categories": [{"label": w, "amount": rng.randrange(1000, 20000)} for w in rng.sample(WORDS, 4)],
+        },
+        lambda: {"type": "taste_memories", "title": "Food", "foods": rng.sample(WORDS, 4), "description": _text(rng, 20)},
+        lambda: {
+            "type": "travel_notes", "title": "Notes",
+            "notes": [{"label": _text(rng, 2), "content": _text(rng, 12)} for _ in range(3)],
+        },
+        lambda: {
+            "type": "related_travelogues", "title": "More",
+            "items": [
+                {"id": f"tl-{rng.randrange(999)}", "title": _text(rng, 4), "category": rng.choice(CATEGORIES),
+                 "author": "Asha", "read_time": "6 min", "rating": 4.6, "thumbnail": _image(rng, full=True)}
+                for _ in range(3)
+            ],
+        },
+        lambda: {"type": "closing_quote", "content": _text(rng, 12), "attribution": "Asha"},
+    ]
+    return {
+        "slug": f"travelogue-{seed}",
+        "title": f"{_text(rng, 3)} in {dests[0]} {seed}",
+        "subtitle": _text(rng, 8),
+        "published_at": f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T10:00:00Z",
+        "author": {"name": "Asha", "avatar": "https://cdn.example.com/a/asha.jpg"},
+        "categories": rng.sample(CATEGORIES, 2),
+        "destinations": dests,
+        "cover_image": _image(rng, full=True),
+        "content_blocks": [rng.choice(makers)() for _ in range(blocks)],
+        "filter_keys": {
+            "budget_min": 10000, "budget_max": 60000, "season": rng.sample(SEASONS, 2),
+            "region": rng.choice(["north", "south", "west", "east"]), "travel_type": "road trip",
+            "tags": rng.sample(WORDS, 4),
+        },
+    }
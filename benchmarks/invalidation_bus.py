@@ -0,0 +1,186 @@
+# benchmarks/invalidation_bus.py
+# Cross-worker invalidation against a real mongod: starts several app processes
+# (what `uvicorn --workers N` runs, but each on its own port so every worker can
+# be addressed), fills every worker's caches, writes through one of them and
+# measures how long each other worker takes to serve the change.
+#
+#   python -m benchmarks.invalidation_bus --mongo-url mongodb://localhost:27017 [--workers 3] [--rounds 20]
+#   python -m benchmarks.invalidation_bus --bus changestream      # replica set
+#
+# Cache TTLs and the feed refresh are raised to an hour, so only the bus can
+# explain a worker seeing a write. Exits non-zero if any worker took longer
+# than --bound seconds. Writes go to their own database (--db, dropped
+# afterwards unless --keep).
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import string
+import subprocess
+import sys
+import time
+
+from benchmarks.fixtures import itinerary
+
+CHECKS = ("update", "search", "publish", "delete")
+
+
+def _word(n: int) -> str:
+    # a search token no fixture text contains
+    letters = string.ascii_lowercase
+    out = "zq"
+    while True:
+        out += letters[n % 26]
+        n //= 26
+        if not n:
+            return out
+
+
+def _start_workers(args) -> list[subprocess.Popen]:
+    env = {
+        **os.environ,
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": args.db,
+        "INVALIDATION_BUS": args.bus,
+        "SEARCH_SNAPSHOT_PATH": "",
+        "MIGRATION_ON_STARTUP": "0",
+        "DOC_CACHE_TTL": "3600",
+        "PUBLISHED_CACHE_TTL": "3600",
+        "FEED_REFRESH_INTERVAL": "3600",
+    }
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port + i), "--log-level", "warning"],
+            env=env,
+        )
+        for i in range(args.workers)
+    ]
+
+
+async def _wait_ready(client, urls: list[str], timeout: float):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if (await client.get(f"{url}/feed")).status_code == 200:
+                    break
+            except Exception:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"worker {url} did not start within {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+async def _until(client, url: str, path: str, done, start: float, timeout: float) -> float:
+    # -> seconds from start until done(response) held on this worker
+    while True:
+        r = await client.get(f"{url}{path}")
+        now = time.perf_counter()
+        if done(r):
+            return now - start
+        if now - start > timeout:
+            return float("inf")
+        await asyncio.sleep(0.005)
+
+
+async def _round(client, urls: list[str], n: int, args) -> dict[str, list[float]]:
+    writer, readers = urls[n % len(urls)], [u for i, u in enumerate(urls) if i != n % len(urls)]
+    created = (await client.post(f"{writer}/itineraries/", json=itinerary(10**6 + n, days=args.days))).json()
+    id, slug = created["id"], created["slug"]
+    await client.post(f"{writer}/itineraries/{id}/publish")
+    # every reader caches the document and the snapshot
+    for url in readers:
+        await client.get(f"{url}/itineraries/{id}")
+        await client.get(f"{url}/itineraries/published/{slug}")
+
+    async def measure(path, done, start):
+        return list(await asyncio.gather(*(_until(client, u, path, done, start, args.timeout) for u in readers)))
+
+    delays = {}
+    title = f"Edited {_word(n)}"
+    await client.put(f"{writer}/itineraries/{id}", json={"title": title, "slug": slug})
+    start = time.perf_counter()
+    delays["update"], delays["search"] = await asyncio.gather(
+        measure(f"/itineraries/{id}", lambda r: r.json()["title"] == title, start),
+        measure(f"/search?q={_word(n)}", lambda r: any(h["id"] == id for h in r.json()["items"]), start),
+    )
+    await client.post(f"{writer}/itineraries/{id}/publish")
+    start = time.perf_counter()
+    delays["publish"] = await measure(f"/itineraries/published/{slug}", lambda r: r.json()["title"] == title, start)
+    await client.delete(f"{writer}/itineraries/{id}")
+    start = time.perf_counter()
+    delays["delete"] = await measure(f"/itineraries/{id}", lambda r: r.json() is None, start)
+    return delays
+
+
+async def run(args) -> dict:
+    import httpx
+
+    urls = [f"http://127.0.0.1:{args.port + i}" for i in range(args.workers)]
+    workers = _start_workers(args)
+    delays = {check: [] for check in CHECKS}
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            await _wait_ready(client, urls, args.startup_timeout)
+            for n in range(args.rounds):
+                for check, values in (await _round(client, urls, n, args)).items():
+                    delays[check] += values
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        if not args.keep:
+            from pymongo import MongoClient
+
+            MongoClient(args.mongo_url).drop_database(args.db)
+
+    results = []
+    for check, values in delays.items():
+        values.sort()
+        results.append({
+            "check": check,
+            "samples": len(values),
+            "p50_ms": round(statistics.median(values) * 1000, 2),
+            "p95_ms": round(values[max(int(len(values) * 0.95) - 1, 0)] * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        })
+    return {"config": {"workers": args.workers, "rounds": args.rounds, "bus": args.bus, "bound_s": args.bound},
+            "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.invalidation_bus")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="trav_invalidation_test", help="scratch database, dropped afterwards")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    parser.add_argument("--bus", default="auto", choices=["auto", "capped", "changestream"])
+    parser.add_argument("--workers", type=int, default=3, help="app processes (at least 2)")
+    parser.add_argument("--port", type=int, default=8100, help="first worker's port")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--days", type=int, default=3, help="days per synthetic itinerary")
+    parser.add_argument("--bound", type=float, default=1.0, help="max seconds for every worker to see a write")
+    parser.add_argument("--timeout", type=float, default=10.0, help="give up waiting on a worker after this")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args(argv)
+    if args.workers < 2:
+        parser.error("--workers must be at least 2")
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.workers} workers, {args.rounds} rounds, bus={args.bus}")
+        print(f"{'check':<10} {'samples':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for r in report["results"]:
+            print(f"{r['check']:<10} {r['samples']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['max_ms']:>8}")
+    slow = [r["check"] for r in report["results"] if r["max_ms"] > args.bound * 1000]
+    if slow:
+        print(f"FAIL {', '.join(slow)}: a worker took longer than {args.bound}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# benchmarks/load_test.py
+# End-to-end load test: runs the app in-process (ASGI, lifespan included), seeds
+# synthetic itineraries and travelogues through the import endpoints, then drives
+# create/list/get/update/delete concurrently and reports latency percentiles,
+# throughput and process memory per endpoint.
+#
+#   python -m benchmarks.load_test --mongo-url mongodb://localhost:27017 [--json]
+#   python -m benchmarks.load_test --in-memory          # needs mongomock-motor
+#   python -m benchmarks.load_test --json > run.json; python -m benchmarks.load_test --baseline run.json
+#
+# Writes go to their own database (--db, dropped afterwards unless --keep).
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+from benchmarks.fixtures import itinerary, travelogue
+
+
+def _rss_mb() -> float:
+    # current resident set size (Linux), else the peak
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _configure(args):
+    # must run before anything imports app.config: the controllers bind their
+    # collections at import time
+    os.environ["DB_NAME"] = args.db
+    os.environ["SEARCH_SNAPSHOT_PATH"] = ""  # keep the run self-contained
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    if args.in_memory:
+        os.environ["INVALIDATION_BUS"] = "off"  # no capped collections in mongomock
+    import app.config as config
+
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+        _patch_mongomock()
+        config.client = AsyncMongoMockClient()
+        config.db = config.client[args.db]
+    return config
+
+
+def _patch_mongomock():
+    # mongomock's bulk builder predates pymongo 4.9's `sort` argument on UpdateOne/ReplaceOne
+    import mongomock.collection as mc
+    from mongomock_motor import AsyncMongoMockCollection
+
+    # read preferences mean nothing in memory; mongomock-motor would return an unwrapped collection
+    AsyncMongoMockCollection.with_options = lambda self, **kwargs: self
+
+    for name in ("add_update", "add_replace", "add_delete"):
+        original = getattr(mc.BulkOperationBuilder, name)
+
+        def wrapper(self, *a, _original=original, **k):
+            k.pop("sort", None)
+            return _original(self, *a, **k)
+
+        setattr(mc.BulkOperationBuilder, name, wrapper)
+
+
+def _ndjson(docs) -> bytes:
+    return b"\n".join(json.dumps(d).encode() for d in docs)
+
+
+async def _seed(client, args) -> dict:
+    ids = {}
+    for kind, path, make in (
+        ("itinerary", "/itineraries/import", lambda i: itinerary(i, days=args.days)),
+        ("travelogue", "/travoulage/import", lambda i: travelogue(i, blocks=args.blocks)),
+    ):
+        count = args.itineraries if kind == "itinerary" else args.travelogues
+        for start in range(0, count, 500):
+            r = await client.post(path, content=_ndjson(make(i) for i in range(start, min(count, start + 500))))
+            r.raise_for_status()
+    for kind, path in (("itinerary", "/itineraries/export"), ("travelogue", "/travoulage/export")):
+        r = await client.get(path, params={"fields": "id"})
+        ids[kind] = [json.loads(line)["id"] for line in r.content.splitlines() if line.strip()]
+    return ids
+
+
+async def _phase(client, name: str, requests: list, concurrency: int) -> dict:
+    # requests: (method, url, kwargs); run with `concurrency` workers
+    latencies, errors = [], 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, url, **kwargs)
+                failed = r.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += failed
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    rss = _rss_mb()
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(max(latencies), 2),
+        "rss_mb": round(rss, 1),
+        "rss_delta_mb": round(rss - rss_before, 1),
+    }
+
+
+async def run(args) -> dict:
+    config = _configure(args)
+    import httpx
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    n = args.requests
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+            seed_start = time.perf_counter()
+            ids = await _seed(client, args)
+            seeded = {"itineraries": len(ids["itinerary"]), "travelogues": len(ids["travelogue"]),
+                      "seconds": round(time.perf_counter() - seed_start, 2)}
+
+            for kind, prefix, make in (
+                ("itinerary", "/itineraries", lambda i: itinerary(10**6 + i, days=args.days)),
+                ("travelogue", "/travoulage", lambda i: travelogue(10**6 + i, blocks=args.blocks)),
+            ):
+                existing = ids[kind]
+                phases = [
+                    (f"POST {prefix}/", [("POST", f"{prefix}/", {"json": make(i)}) for i in range(n)]),
+                    (f"GET {prefix}/", [("GET", f"{prefix}/", {"params": {"limit": 20}}) for _ in range(n)]),
+                ]
+                if existing:
+                    phases += [
+                        (f"GET {prefix}/{{id}}", [("GET", f"{prefix}/{rng.choice(existing)}", {}) for _ in range(n)]),
+                        (f"PUT {prefix}/{{id}}", [
+                            ("PUT", f"{prefix}/{rng.choice(existing)}", {"json": {"subtitle": f"edit {i}"}})
+                            for i in range(n)
+                        ]),
+                    ]
+                for name, requests in phases:
+                    results.append(await _phase(client, name, requests, args.concurrency))
+                # delete what the POST phase created
+                r = await client.get(f"{prefix}/export", params={"fields": "id"})
+                created = [json.loads(line)["id"] for line in r.content.splitlines() if line.strip()]
+                seeded_ids = set(existing)
+                created = [i for i in created if i not in seeded_ids]
+                if created:
+                    results.append(await _phase(
+                        client, f"DELETE {prefix}/{{id}}", [("DELETE", f"{prefix}/{i}", {}) for i in created], args.concurrency
+                    ))
+        if not args.keep:  # inside the lifespan: the client is closed on shutdown
+            await config.client.drop_database(args.db)
+
+    return {
+        "config": {
+            "backend": "in-memory" if args.in_memory else "mongod",
+            "requests_per_endpoint": n,
+            "concurrency": args.concurrency,
+            "days": args.days,
+            "blocks": args.blocks,
+        },
+        "seeded": seeded,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    before = {r["endpoint"]: r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        old = before.get(r["endpoint"])
+        if not old:
+            continue
+        if r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['endpoint']} p95 {old['p95_ms']} -> {r['p95_ms']} ms")
+        if r["rps"] < old["rps"] / (1 + tolerance):
+            regressions.append(f"{r['endpoint']} rps {old['rps']} -> {r['rps']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--mongo-url", help="mongod to run against (default: MONGO_URL)")
+    backend.add_argument("--in-memory", action="store_true", help="mongomock-motor instead of a server")
+    parser.add_argument("--db", default="trav_load_test", help="scratch database, dropped afterwards")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    parser.add_argument("--itineraries", type=int, default=500)
+    parser.add_argument("--travelogues", type=int, default=500)
+    parser.add_argument("--days", type=int, default=7, help="days per synthetic itinerary")
+    parser.add_argument("--blocks", type=int, default=40, help="content blocks per synthetic travelogue")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint (at least 1)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    parser.add_argument("--baseline", help="JSON output of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/rps regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"seeded {report['seeded']['itineraries']} itineraries, {report['seeded']['travelogues']} travelogues "
+              f"in {report['seeded']['seconds']}s ({report['config']['backend']})")
+        print(f"{'endpoint':<28} {'reqs':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8}")
+        for r in report["results"]:
+            print(f"{r['endpoint']:<28} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8} "
+                  f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['rss_mb']:>8}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()